@@ -1,7 +1,10 @@
 import asyncio
+import datetime
 import logging
 import contextlib
+import multiprocessing
 import os
+from typing import Optional
 
 from .core.logging_app import setup_logging
 from .core import initialization_settings
@@ -12,6 +15,26 @@ async def test_procedure():
 
         pass
 
+async def initialize_database(is_models: bool = True) -> bool:
+    """Initializes the database engine and, optionally, creates the tables and fills the daily attendance aggregate."""
+    from .core.settings import settings
+    from .db import db_session_manager
+
+    db_path = settings.get_database_url()
+    if not db_path:
+        logging.error("Database path must be specified in the configuration file.")
+        return False
+
+    logging.info(f"Initializing database with path: {db_path}")
+    db_session_manager.initialize(db_path)
+    if is_models:
+        from .db.crud.daily_attendance import ensure_daily_attendance
+
+        await db_session_manager.init_models()
+        if (rows := await ensure_daily_attendance()) is not None:
+            logging.info(f"Daily attendance built from the stored visits: {rows} rows.")
+    return True
+
 async def initialize_application(is_models: bool = True) -> bool:
     """
     Comprehensive async application initialization.
@@ -22,18 +45,10 @@ async def initialize_application(is_models: bool = True) -> bool:
         setup_logging()
         initialization_settings()
 
-        from .core.settings import settings, DIR_DATA
-        from .db import db_session_manager
+        from .core.settings import settings, DIR_DATA, SYNC_SCHEDULE_ENABLED
 
-        db_path = settings.get_database_url()
-        if not db_path:
-            logging.error("Database path must be specified in the configuration file.")
+        if not await initialize_database(is_models):
             return False
-
-        logging.info(f"Initializing database with path: {db_path}")
-        db_session_manager.initialize(db_path)
-        if is_models:
-            await db_session_manager.init_models()
         
         if DIR_DATA: 
             os.makedirs(os.path.dirname(f'{DIR_DATA}/'), exist_ok=True)    
@@ -41,8 +56,21 @@ async def initialize_application(is_models: bool = True) -> bool:
         await test_procedure()
         if settings.telegram_bot_token:
             from .bot.run_bot import running_bot
+            sync_scheduler = None
+            if SYNC_SCHEDULE_ENABLED:
+                from .services.scheduler import VisitingSyncScheduler
+                sync_scheduler = VisitingSyncScheduler()
+                sync_scheduler.start()
             logging.info("Bot is starting...")
-            await running_bot()
+            try:
+                await running_bot()
+            finally:
+                if sync_scheduler:
+                    sync_scheduler.shutdown()
+                from .services.jobs import job_runner
+                from .services.reports import report_renderer
+                await job_runner.shutdown()
+                report_renderer.shutdown()
             logging.info("Bot started successfully. Ready to run tasks.")
         else:
             logging.error('Telegram bot token is missing. Bot will not start.')
@@ -59,6 +87,107 @@ async def initialize_application(is_models: bool = True) -> bool:
         logging.error(f"Application initialization error: {e}", exc_info=True)
         return False
 
+async def _run_sync_worker(is_models: bool) -> None:
+    """Runs one headless sync worker in the current process."""
+    setup_logging()
+    initialization_settings()
+
+    from .db import db_session_manager
+    from .services.sync_worker import SyncWorker
+
+    if not await initialize_database(is_models):
+        return
+    try:
+        await SyncWorker().run()
+    finally:
+        await db_session_manager.shutdown()
+
+async def run_backfill(
+    start_date: datetime.date,
+    end_date: Optional[datetime.date] = None,
+    window: str = "month",
+    teacher_telegram_id: Optional[int] = None,
+    is_models: bool = True,
+) -> None:
+    """Runs a checkpointed historical backfill; rerunning it resumes where it stopped."""
+    setup_logging()
+    initialization_settings()
+
+    from .db import db_session_manager
+    from .services.backfill import backfill_visiting
+
+    if not await initialize_database(is_models):
+        return
+    try:
+        await backfill_visiting(
+            start_date=start_date, end_date=end_date, window=window, teacher_telegram_id=teacher_telegram_id)
+    finally:
+        await db_session_manager.shutdown()
+
+async def run_rebuild_daily_attendance(
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    is_models: bool = True,
+) -> None:
+    """Recomputes the daily attendance aggregate from the stored visits."""
+    setup_logging()
+    initialization_settings()
+
+    from .db import db_session_manager
+    from .db.crud.daily_attendance import rebuild_daily_attendance
+
+    if not await initialize_database(is_models):
+        return
+    try:
+        rows = await rebuild_daily_attendance(start_date=start_date, end_date=end_date)
+        logging.info(f"Daily attendance rebuilt: {rows} rows.")
+    finally:
+        await db_session_manager.shutdown()
+
+async def run_export_attendance(
+    output_dir: str,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+) -> None:
+    """Exports the attendance history to monthly Parquet partitions."""
+    setup_logging()
+    initialization_settings()
+
+    from .db import db_session_manager
+    from .services.export import export_attendance
+
+    if not await initialize_database(is_models=False):
+        return
+    try:
+        await export_attendance(output_dir, start_date=start_date, end_date=end_date)
+    finally:
+        await db_session_manager.shutdown()
+
+def _sync_worker_process(is_models: bool) -> None:
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_run_sync_worker(is_models))
+
+def run_sync_workers(count: int = 2, is_models: bool = True) -> None:
+    """
+    Starts `count` sync worker processes and waits for them.
+
+    Only the first worker creates the tables, so the others do not race on DDL.
+    """
+    processes = [
+        multiprocessing.Process(
+            target=_sync_worker_process, args=(is_models and index == 0,), name=f"sync-worker-{index}")
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+
 def main():
     """
     Entry point for application startup with graceful error handling.
@@ -0,0 +1,34 @@
+import hashlib
+import logging
+from typing import Any
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+
+from app.services.report_cache import ReportCache
+
+logger = logging.getLogger(__name__)
+
+# (sha256 of the content, filename) -> file_id returned by Telegram for the first upload
+_file_ids = ReportCache()
+
+
+async def answer_document_cached(message: types.Message, content: bytes, filename: str, **kwargs: Any) -> types.Message:
+    """
+    Send a document, uploading it only the first time this exact content is sent.
+
+    Later sends of the same bytes under the same filename reuse the ``file_id``
+    Telegram returned for the upload. A file_id Telegram no longer accepts is
+    dropped and the file is uploaded again.
+    """
+    key = (hashlib.sha256(content).hexdigest(), filename)
+    if file_id := _file_ids.get(key):
+        try:
+            return await message.answer_document(file_id, **kwargs)
+        except TelegramBadRequest as e:
+            logger.warning(f"Cached file_id for {filename} was rejected, uploading again: {e}")
+
+    sent = await message.answer_document(types.BufferedInputFile(content, filename=filename), **kwargs)
+    if sent.document:
+        _file_ids.put(key, sent.document.file_id)
+    return sent
@@ -1,7 +1,13 @@
 from aiogram import types, Router
 from aiogram.filters import Command
 from app.bot.handlers.support import is_admin
+from app.bot.progress import start_job_with_progress
+from app.core.settings import USE_SYNC_WORKERS
+from app.db.crud.sync_jobs import get_recent_sync_jobs
 from app.db.tools import clear_database, test_visiting
+from app.services.jobs import job_runner
+from app.services.progress import ProgressChannel
+from app.services.sync_worker import enqueue_visiting_sync
 from app.services.visiting import parse_visiting_of_pair
 import logging
 
@@ -44,9 +50,49 @@ async def clear_visiting_command(message: types.Message) -> None:
 async def parse_visiting_command(message: types.Message) -> None:
     """Initiate visiting data parsing process."""
     try:
-        await message.answer("Начинаем парсинг данных о посещениях...")
-        await parse_visiting_of_pair()
-        await message.answer("Парсинг данных о посещениях успешно завершён.")
+        if USE_SYNC_WORKERS:
+            job_ids = await enqueue_visiting_sync()
+            await message.answer(f"В очередь поставлено задач парсинга: {len(job_ids)}. Статус: /sync-jobs")
+            return
+
+        async def job(progress: ProgressChannel) -> str:
+            stats = await parse_visiting_of_pair(progress=progress)
+            summary = f"\n{stats.summary()}" if stats else ""
+            return f"Парсинг данных о посещениях успешно завершён.{summary}"
+
+        await start_job_with_progress(message, "all-visiting", "Начинаем парсинг данных о посещениях...", job)
     except Exception as e:
         logger.error(f"Parsing error: {e}")
         await message.answer("Произошла ошибка при парсинге данных о посещениях.")
+
+@admin_router.message(Command(commands=["sync-jobs"]))
+@is_admin
+async def sync_jobs_command(message: types.Message) -> None:
+    """Show the most recent visiting sync jobs."""
+    jobs = await get_recent_sync_jobs()
+    if not jobs:
+        await message.answer("Задач парсинга нет.")
+        return
+    lines = [
+        f"#{job.id} преп. {job.teacher_id}, {job.start_date}..{job.end_date}: "
+        f"{job.status.name.lower()}, попыток {job.attempts}"
+        + (f" ({job.leased_by})" if job.leased_by else "")
+        for job in jobs
+    ]
+    await message.answer("\n".join(lines))
+
+
+@admin_router.message(Command(commands=["jobs"]))
+@is_admin
+async def jobs_command(message: types.Message) -> None:
+    """Show the bot's background jobs."""
+    jobs = job_runner.jobs()[:20]
+    if not jobs:
+        await message.answer("Фоновых задач нет.")
+        return
+    lines = [
+        f"{job.id} {job.name} (user {job.owner}): {job.status.value}"
+        + (f", {job.error}" if job.error else "")
+        for job in jobs
+    ]
+    await message.answer("\n".join(lines))
@@ -1,4 +1,3 @@
-import asyncio
 from typing import Dict, Any, Callable
 from functools import wraps
 from aiogram import types, Router
@@ -9,6 +8,8 @@ from aiogram.types import ReplyKeyboardRemove
 from app.bot.keyboards import teacher_menu_keyboard
 import logging
 
+from app.bot.progress import start_job_with_progress
+from app.services.progress import ProgressChannel
 from app.services.teacher import TeacherDataService
 
 
@@ -101,9 +102,14 @@ async def handle_password(
         auth_response = await AuthService.authenticate_user(auth_payload)
         await handle_auth_response(message, auth_response)
         if auth_response.get("role", None) == "teacher":
-            asyncio.create_task(
-                TeacherDataService.parse_teacher_data(telegram_id=message.from_user.id)
-            )
+            async def job(progress: ProgressChannel) -> str:
+                result = await TeacherDataService.parse_and_update_teacher_data(
+                    telegram_id=message.from_user.id, progress=progress)
+                return (
+                    f"Данные загружены: групп {result['groups_count']}, "
+                    f"студентов {result['students_count']}.")
+
+            await start_job_with_progress(message, "teacher-data", "Загружаем ваши группы и студентов...", job)
 
     except Exception as e:
         logging.error(f"Error during authentication: {e}")
@@ -2,15 +2,16 @@
 import logging
 from mailbox import Message
 from aiogram import F, types, Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from app.bot.handlers.auth import AuthStates
 from app.bot.middlewares.ThrottlingMiddleware import ThrottlingMiddleware,rate_limit
 from app.db.crud.users import get_user_of_telegram_id
-from app.bot.keyboards import registration_kb,teacher_menu_keyboard
+from app.bot.keyboards import registration_kb,student_menu_keyboard,teacher_menu_keyboard
 from aiogram.types import ReplyKeyboardRemove
 
 from app.db.models.users import UserRole
+from app.services.jobs import job_runner
 common_router = Router()  
 common_router.message.middleware(ThrottlingMiddleware())
 
@@ -25,10 +26,26 @@ async def send_help(message: types.Message) -> None:
     /register - Начать процесс регистрации
     /help - Получить список доступных команд
     /profile - Просмотреть ваш профиль
+    /progress - Посещаемость студента за период
+    /cancel - Отменить выполняющиеся задачи
     """
     await message.reply(help_text)
 
 
+@common_router.message(Command(commands=["cancel"]))
+async def cancel_job(message: types.Message, command: CommandObject) -> None:
+    """Cancel one of the user's background jobs, or all of them without an argument."""
+    jobs = [job for job in job_runner.jobs(owner=message.from_user.id) if job.active]
+    if command.args:
+        jobs = [job for job in jobs if job.id == command.args.strip()]
+    if not jobs:
+        await message.reply("Нет активных задач для отмены.")
+        return
+    for job in jobs:
+        job_runner.cancel(job.id)
+    await message.reply("Отменено задач: " + ", ".join(job.id for job in jobs))
+
+
 @common_router.message(Command(commands=["start"])) 
 async def start_bot(message: Message,state: FSMContext) -> None:
     """Handle /start command."""
@@ -51,7 +68,7 @@ async def back_to_menu(message: Message, state: FSMContext):
         if user.role == UserRole.TEACHER:
             await message.answer("Главное меню:", reply_markup=teacher_menu_keyboard)
         elif user.role == UserRole.STUDENT:
-            await message.answer("Главное меню:")
+            await message.answer("Главное меню:", reply_markup=student_menu_keyboard)
 
 
 
@@ -1,14 +1,92 @@
+from datetime import date, datetime
+
 from aiogram import types, Router
 from aiogram.filters import Command
+from aiogram.filters.state import State, StatesGroup
+from aiogram.fsm.context import FSMContext
+from aiogram.types import ReplyKeyboardRemove
+
+from app.bot.handlers.common import back_to_menu
+from app.bot.keyboards import period_keyboard, student_menu_keyboard
+from app.services.reports import format_data_age
+from app.services.student import StudentDataService
+from .support import get_dates_from_period, is_student
 
 student_router: Router = Router()
 
+
+class StudentPeriod(StatesGroup):
+    waiting_for_period = State()
+    waiting_for_custom_period = State()
+
+
+def _format_attendance(attendance: dict, start_date: date, end_date: date) -> str:
+    period = f"{start_date.strftime('%d-%m-%Y')} — {end_date.strftime('%d-%m-%Y')}"
+    disciplines = attendance["disciplines"]
+    if not disciplines:
+        return f"Посещаемость за {period}:\nЗанятий не найдено."
+
+    lines = [f"Посещаемость за {period}:"]
+    for discipline, counts in disciplines.items():
+        attended = counts["total"] - counts["missed"]
+        lines.append(f"  - {discipline}: {attended}/{counts['total']} ({attended * 100 // counts['total']}%)")
+    missed_total = sum(counts["missed"] for counts in disciplines.values())
+    lines.append(f"Всего пропусков: {missed_total}")
+    if attendance["missed_dates"]:
+        lines.append("Дни с пропусками: " + ", ".join(day.strftime("%d-%m") for day in attendance["missed_dates"]))
+    return "\n".join(lines)
+
+
+async def _send_attendance(message: types.Message, start_date: date, end_date: date) -> None:
+    attendance = await StudentDataService.fetch_attendance(message.from_user.id, start_date, end_date)
+    await message.reply(_format_attendance(attendance, start_date, end_date), reply_markup=student_menu_keyboard)
+
+
 @student_router.message(Command(commands=["progress"]))
-async def show_progress(message: types.Message) -> None:
-    # Здесь можно получить данные из БД о прогрессе студента
-    await message.reply("Ваш прогресс:\n1. Математика: 80%\n2. Физика: 70%")
+@is_student
+async def show_progress(message: types.Message, state: FSMContext) -> None:
+    await message.reply("Выберите период:", reply_markup=period_keyboard)
+    await state.set_state(StudentPeriod.waiting_for_period)
+
+
+@student_router.message(StudentPeriod.waiting_for_period)
+@is_student
+async def process_progress_period(message: types.Message, state: FSMContext) -> None:
+    if message.text == "Указать период":
+        await message.reply("Пожалуйста, укажите период в формате ГГГГ-ММ-ДД - ГГГГ-ММ-ДД", reply_markup=ReplyKeyboardRemove())
+        await state.set_state(StudentPeriod.waiting_for_custom_period)
+        return
+    if message.text == "Назад":
+        return await back_to_menu(message, state)
+    try:
+        start_date, end_date = get_dates_from_period(message.text, date.today())
+    except ValueError:
+        await message.reply("Неверный выбор периода.", reply_markup=student_menu_keyboard)
+        return await state.clear()
+    await state.clear()
+    await _send_attendance(message, start_date, end_date)
+
+
+@student_router.message(StudentPeriod.waiting_for_custom_period)
+@is_student
+async def process_progress_custom_period(message: types.Message, state: FSMContext) -> None:
+    try:
+        start_str, end_str = message.text.split(" - ")
+        start_date = datetime.strptime(start_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_str, "%Y-%m-%d").date()
+    except ValueError:
+        await message.reply("Неверный формат даты. Пожалуйста, используйте формат ГГГГ-ММ-ДД - ГГГГ-ММ-ДД.")
+        return
+    await state.clear()
+    await _send_attendance(message, start_date, end_date)
+
 
 @student_router.message(Command(commands=["profile"]))
+@is_student
 async def show_profile(message: types.Message) -> None:
-    # Пример профиля студента
-    await message.reply("Ваш профиль:\nИмя: Иван Иванов\nГруппа: 101")
+    profile = await StudentDataService.fetch_profile(message.from_user.id)
+    group = profile["group_name"] or "не назначена"
+    text = f"Ваш профиль:\nИмя: {profile['full_name']}\nГруппа: {group}"
+    if profile["group_name"]:
+        text += f"\nПосещаемость: {format_data_age(profile['last_parsed_at'])}"
+    await message.reply(text, reply_markup=student_menu_keyboard)
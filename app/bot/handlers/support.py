@@ -1,7 +1,8 @@
+from datetime import date, timedelta
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Callable, Tuple
 from app.core.settings import ID_ADMIN
-from app.db.crud.users import get_teacher
+from app.db.crud.users import get_student_card, get_teacher
 from aiogram.types import Message
 
 def is_teacher(func: Callable):
@@ -23,6 +24,15 @@ def is_teacher_of_data(func: Callable):
                 return await message.reply("Пожалуйста, сначала обновите данные о студентах и группах.")
     return wrapper
 
+def is_student(func: Callable):
+    """Runs the handler only for users registered as students."""
+    @wraps(func)
+    async def wrapper(message: Message,*args, **kwargs) -> Any:
+        if await get_student_card(telegram_id=message.from_user.id):
+            return await func(message,*args, **kwargs)
+        return await message.reply("Команда доступна только зарегистрированным студентам.")
+    return wrapper
+
 def is_admin(func):
     @wraps(func)
     async def wrapper(message: Message, *args, **kwargs):
@@ -31,4 +41,16 @@ def is_admin(func):
             return await func(message, *args, **kwargs)
         await message.reply("У вас нет прав администратора.")
         return None
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def get_dates_from_period(period: str, today: date) -> Tuple[date, date]:
+    """Start and end date of a period picked on `period_keyboard`; raises ValueError for anything else."""
+    if period == "За сегодня":
+        return today, today
+    elif period == "Последние 7 дней":
+        return today - timedelta(days=7), today
+    elif period == "Последние 30 дней":
+        return today - timedelta(days=30), today
+    else:
+        raise ValueError("Invalid period")
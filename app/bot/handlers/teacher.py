@@ -1,8 +1,5 @@
 import logging
-import os
-import random
 import pandas as pd
-import xlsxwriter
 
 from datetime import date, timedelta, datetime
 from aiogram import types, Router, Bot
@@ -11,12 +8,27 @@ from aiogram.filters.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 from aiogram.types import ReplyKeyboardRemove
 
+from app.bot.documents import answer_document_cached
 from app.bot.handlers.common import back_to_menu
-from app.core.settings import DIR_DATA, tz
+from app.bot.progress import start_job_with_progress
+from app.core.settings import PREFETCH_ENABLED, USE_SYNC_WORKERS, tz
 from app.services.teacher import TeacherDataService
+from app.services.progress import ProgressChannel
+from app.services.report_cache import report_cache
+from app.services.reports import RenderQueueFull, build_absences_summary, build_absences_workbook, report_renderer
+from app.services.absences import (
+    absence_totals,
+    refresh_groups,
+    report_generations,
+    stale_group_ids,
+    start_background_refresh,
+    start_prefetch,
+    wait_for_prefetch,
+)
+from app.services.sync_worker import enqueue_visiting_sync
 from app.services.visiting import parse_visiting_of_pair
 from app.bot.keyboards import teacher_menu_keyboard, period_keyboard,absences_format_keyboard
-from .support import is_teacher, is_teacher_of_data
+from .support import get_dates_from_period, is_teacher, is_teacher_of_data
 
 teacher_router = Router()
 
@@ -30,21 +42,34 @@ class AbsencesFormat(StatesGroup):
 
 
 
-async def _get_dates_from_period(period: str, today: date) -> tuple[date, date]:
-    if period== "За сегодня":
-        return today,today
-    elif period == "Последние 7 дней":
-        return today - timedelta(days=7), today
-    elif period == "Последние 30 дней":
-        return today - timedelta(days=30), today
-    else:
-        raise ValueError("Invalid period")
+async def _start_prefetch(message: types.Message) -> None:
+    """Warm the periods a teacher most likely picks next while the period keyboard is shown."""
+    if PREFETCH_ENABLED:
+        today = date.today()
+        start_prefetch(message.from_user.id, [
+            get_dates_from_period(period, today) for period in ("За сегодня", "Последние 7 дней")
+        ])
 
 async def _process_visiting(message: types.Message, start_date: date, end_date: date) -> None:
     try:
-        await message.answer("Начинаем парсинг данных о посещениях...", reply_markup=teacher_menu_keyboard)
-        await parse_visiting_of_pair(teacher_telegram_id=message.from_user.id, start_date=start_date, end_date=end_date)
-        await message.answer("Парсинг данных о посещениях успешно завершён.")
+        if USE_SYNC_WORKERS:
+            job_ids = await enqueue_visiting_sync(
+                teacher_telegram_id=message.from_user.id, start_date=start_date, end_date=end_date)
+            await message.answer(
+                f"Парсинг поставлен в очередь (задача {', '.join(map(str, job_ids))}).",
+                reply_markup=teacher_menu_keyboard)
+            return
+
+        async def job(progress: ProgressChannel) -> str:
+            # A prefetch left over from the absences menu would scrape the same pages
+            await wait_for_prefetch(message.from_user.id)
+            stats = await parse_visiting_of_pair(
+                teacher_telegram_id=message.from_user.id, start_date=start_date, end_date=end_date, progress=progress)
+            summary = f"\n{stats.summary()}" if stats else ""
+            return f"Парсинг данных о посещениях завершён.{summary}"
+
+        await start_job_with_progress(
+            message, "visiting", "Начинаем парсинг данных о посещениях...", job, reply_markup=teacher_menu_keyboard)
     except Exception as e:
         logging.error(f"Parsing error: {e}")
         await message.answer(f"Произошла ошибка при парсинге данных о посещениях: {e}")
@@ -53,101 +78,85 @@ async def _process_visiting(message: types.Message, start_date: date, end_date:
 async def _process_absences(message: types.Message, start_date: date, end_date: date, to_file: bool = False) -> None:
     """
     Processes student absences for a given date range and sends results as a message or file.
+
+    Results come straight from the database. Groups whose data is stale are refreshed
+    in the background, and a follow-up is sent only if the numbers changed.
     """
-    absences_data = await TeacherDataService.fetch_student_absences(message.from_user.id, start_date, end_date)
+    absences_data = await TeacherDataService.fetch_student_absences(
+        message.from_user.id, start_date, end_date, by_date=to_file)
 
     if not absences_data:
         await message.reply("Пропусков нет.", reply_markup=teacher_menu_keyboard)
         return
 
-    if to_file:
-        await _generate_absences_file(message, absences_data)
-    else:
-        await _send_absences_summary(message, absences_data)
-
-
-async def _generate_absences_file(message: types.Message, absences_data: dict) -> None:
-    """
-    Generates an Excel file with absence details and sends it to the user.
-    """
-    filename = f"{DIR_DATA}/files_telegram/absences_{message.from_user.id}_{random.randint(100000, 999999)}.xlsx"
-    os.makedirs(os.path.dirname(filename), exist_ok=True) 
-    workbook = xlsxwriter.Workbook(filename)
-
-    for group_name, group_data in absences_data.items():
-        worksheet = _create_group_worksheet(workbook, group_name, group_data)
-
-    workbook.close()
+    try:
+        await _send_absences(message, absences_data, start_date, end_date, to_file)
+    except RenderQueueFull:
+        await message.reply(
+            "Сейчас формируется много отчётов, попробуйте через минуту.", reply_markup=teacher_menu_keyboard)
+        return
 
-    with open(filename, "rb") as file:
-        await message.answer_document(
-            types.BufferedInputFile(file.read(), filename=filename),
-            reply_markup=teacher_menu_keyboard,
+    if stale_ids := stale_group_ids(absences_data, start_date, end_date):
+        started = start_background_refresh(
+            message.from_user.id,
+            lambda: _revalidate_absences(message, start_date, end_date, to_file, absences_data, stale_ids),
         )
+        if started:
+            await message.answer(
+                "Часть данных устарела, обновляю в фоне. Если цифры изменятся, пришлю обновлённый отчёт.",
+                reply_markup=teacher_menu_keyboard,
+            )
 
 
-def _create_group_worksheet(workbook, group_name: str, group_data: dict):# -> Any:
-    """
-    Creates a worksheet for a specific group in the Excel file.
-    """
-    worksheet = workbook.add_worksheet(group_name)
-    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
-    students = group_data["data"]
-
-    dates = sorted(
-        {date_str for student_data in students.values()
-         for date_str in student_data['dates']}
-    )
+async def _send_absences(
+    message: types.Message, absences_data: dict, start_date: date, end_date: date, to_file: bool
+) -> None:
+    if to_file:
+        await _generate_absences_file(message, absences_data, start_date, end_date)
+    else:
+        await _send_absences_summary(message, absences_data)
 
-    worksheet.write_row(0, 1, dates, date_format)
-    worksheet.write(0, 0, "Имя студента")
-    worksheet.write(0, len(dates) + 1, "Total")
 
-    for row, (student_id, data) in enumerate(students.items(), start=1):
-        worksheet.write(row, 0, data['name'])
-        total_absences = 0
+async def _revalidate_absences(
+    message: types.Message, start_date: date, end_date: date, to_file: bool, absences_data: dict, group_ids: set
+) -> None:
+    """Refresh stale groups and resend the report if the absence counts changed."""
+    await wait_for_prefetch(message.from_user.id)
+    current = await TeacherDataService.fetch_student_absences(message.from_user.id, start_date, end_date)
+    if group_ids := group_ids & stale_group_ids(current, start_date, end_date):
+        await refresh_groups(message.from_user.id, start_date, end_date, group_ids)
+    refreshed = await TeacherDataService.fetch_student_absences(
+        message.from_user.id, start_date, end_date, by_date=to_file)
+    if absence_totals(refreshed) == absence_totals(absences_data):
+        logging.info(f"Background refresh for {message.from_user.id} changed nothing.")
+        return
+    await message.answer("Данные о посещениях обновились:", reply_markup=teacher_menu_keyboard)
+    await _send_absences(message, refreshed, start_date, end_date, to_file)
 
-        for col, date_str in enumerate(dates, start=1):
-            count = data['dates'].count(date_str)
-            worksheet.write(row, col, count)
-            total_absences += count
 
-        worksheet.write(row, len(dates) + 1, total_absences)
+async def _generate_absences_file(
+    message: types.Message, absences_data: dict, start_date: date, end_date: date
+) -> None:
+    """
+    Generates an Excel file with absence details and sends it to the user.
 
-    last_row = len(students) + 1
-    worksheet.write(last_row, 0, "Grand Total")
-    for col, date_str in enumerate(dates, start=1):
-        column_sum = sum(students[student_id]['dates'].count(
-            date_str) for student_id in students)
-        worksheet.write(last_row, col, column_sum)
-    worksheet.write(last_row, len(
-        dates) + 1, sum(len(students[student_id]['dates']) for student_id in students))
+    The workbook is reused until one of the covered groups gets new data, and a
+    workbook that was already sent is resent by its Telegram file_id.
+    """
+    cache_key = ("absences-file", message.from_user.id, start_date, end_date, report_generations(absences_data))
+    if (workbook := report_cache.get(cache_key)) is None:
+        workbook = await report_renderer.render(build_absences_workbook, absences_data)
+        report_cache.put(cache_key, workbook)
 
-    return worksheet
+    await answer_document_cached(
+        message, workbook, f"absences_{message.from_user.id}.xlsx", reply_markup=teacher_menu_keyboard)
 
 
 async def _send_absences_summary(message: types.Message, absences_data: dict) -> None:
     """
     Sends a text summary of absences for each group.
     """
-    for group_name, group_data in absences_data.items():
-        group = group_data["group"]
-        last_parsed_at = group.attendance_logs[0].last_parsed_at if group.attendance_logs else "Никогда"
-        formatted_last_parsed = last_parsed_at.strftime('%d-%m-%Y %H:%M')
-        caption = f"{group_name} (данные обновлялись {formatted_last_parsed}):"
-
-        absences_text = f"{caption}\n"
-        students = group_data["data"]
-
-        if students:
-            absences_text += "\n".join(
-                f"  - {student_data['name']
-                       }: {len(student_data['dates'])} пропусков"
-                for student_data in students.values()
-            )
-        else:
-            absences_text += "  Пропусков нет."
-
+    for absences_text in await report_renderer.render(build_absences_summary, absences_data):
         await message.reply(absences_text, reply_markup=teacher_menu_keyboard)
 
 
@@ -166,7 +175,7 @@ async def _process_period_selection(message: types.Message, state: FSMContext, c
         elif message.text == 'Назад':
             await back_to_menu(message, state)
         else:
-            start_date, end_date = await _get_dates_from_period(message.text, today)
+            start_date, end_date = get_dates_from_period(message.text, today)
 
             if command == "visiting":
                 await _process_visiting(message, start_date, end_date)
@@ -195,9 +204,15 @@ async def list_groups(message: types.Message) -> None:
 async def parse_data(message: types.Message) -> None:
     """Initiate data parsing process."""
     try:
-        await message.answer("Начинаем парсинг данных...",reply_markup=teacher_menu_keyboard)
-        await TeacherDataService.parse_and_update_teacher_data(telegram_id=message.from_user.id)
-        await message.answer("Парсинг данных успешно завершён.")
+        async def job(progress: ProgressChannel) -> str:
+            result = await TeacherDataService.parse_and_update_teacher_data(
+                telegram_id=message.from_user.id, progress=progress)
+            return (
+                f"Парсинг данных успешно завершён: групп {result['groups_count']}, "
+                f"студентов {result['students_count']}.")
+
+        await start_job_with_progress(
+            message, "teacher-data", "Начинаем парсинг данных...", job, reply_markup=teacher_menu_keyboard)
     except Exception as e:
         logging.error(f"Parsing error: {e}")
         await message.answer(f"Произошла ошибка при парсинге данных: {e}")
@@ -263,6 +278,7 @@ async def process_custom_period(message: types.Message, state: FSMContext):
 @is_teacher_of_data
 async def cmd_absences(message: types.Message, state: FSMContext, command: CommandObject):
     await message.reply("Выберите период:", reply_markup=period_keyboard)
+    await _start_prefetch(message)
     await state.set_state(PeriodSelection.waiting_for_period)
     if isinstance(command, CommandObject):
         await state.update_data(command=command.command)
@@ -281,6 +297,7 @@ async def process_absences_period(message: types.Message, state: FSMContext):
 async def cmd_form_absences(message: types.Message, state: FSMContext):
     await message.reply("Выберите формат отчета о пропусках:", reply_markup=absences_format_keyboard)
     await state.set_state(AbsencesFormat.waiting_for_format)
+    await _start_prefetch(message)
 
 
 @teacher_router.message(AbsencesFormat.waiting_for_format)
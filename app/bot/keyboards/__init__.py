@@ -1,2 +1,3 @@
 from .common import registration_kb
-from .teacher import teacher_menu_keyboard,period_keyboard,absences_format_keyboard
\ No newline at end of file
+from .teacher import teacher_menu_keyboard,period_keyboard,absences_format_keyboard
+from .student import student_menu_keyboard
\ No newline at end of file
@@ -4,6 +4,7 @@ from aiogram.fsm.context import FSMContext
 
 from app.bot.handlers.common import back_to_menu, start_registration
 from app.bot.handlers.teacher import list_groups,cmd_absences,cmd_visiting,parse_data, cmd_form_absences, students_for_message
+from app.bot.handlers.student import show_profile, show_progress
 from app.bot.keyboards.teacher import update_data_keyboard
 
 router_handler_command = Router()
@@ -47,6 +48,20 @@ async def handle_visiting(message: Message, state: FSMContext):
     return await cmd_visiting(message, state,'visiting')
 
 
+@router_handler_command.message(F.text == "Моя посещаемость")
+async def handle_progress(message: Message, state: FSMContext):
+    """Handle 'Моя посещаемость' button click."""
+    await state.clear()
+    return await show_progress(message, state)
+
+
+@router_handler_command.message(F.text == "Профиль")
+async def handle_profile(message: Message, state: FSMContext):
+    """Handle 'Профиль' button click."""
+    await state.clear()
+    return await show_profile(message)
+
+
 @router_handler_command.message(F.text == "Назад")
 async def handle_back(message: Message, state: FSMContext):
     """Handle 'Посещения' button click."""
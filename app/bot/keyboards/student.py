@@ -0,0 +1,9 @@
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+
+student_menu_keyboard = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="Моя посещаемость")],
+        [KeyboardButton(text="Профиль")],
+    ],
+    resize_keyboard=True,
+)
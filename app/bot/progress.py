@@ -0,0 +1,72 @@
+import asyncio
+import contextlib
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram import types
+from aiogram.exceptions import TelegramAPIError
+
+from app.core.settings import PROGRESS_EDIT_INTERVAL
+from app.services.jobs import job_runner
+from app.services.progress import ProgressChannel
+
+logger = logging.getLogger(__name__)
+
+
+async def _stream_progress(status_message: types.Message, channel: ProgressChannel) -> None:
+    """Edit one status message with the channel's updates, at most once per PROGRESS_EDIT_INTERVAL."""
+    async for text in channel.updates(PROGRESS_EDIT_INTERVAL):
+        with contextlib.suppress(TelegramAPIError):
+            await status_message.edit_text(text)
+
+
+async def _run_with_progress(
+    status_message: types.Message, title: str, job: Callable[[ProgressChannel], Awaitable[str]]
+) -> str:
+    channel = ProgressChannel(title)
+    streamer = asyncio.create_task(_stream_progress(status_message, channel))
+    try:
+        text = await job(channel)
+    except asyncio.CancelledError:
+        channel.close("Операция отменена.")
+        await streamer
+        raise
+    except Exception as e:
+        channel.close(f"Произошла ошибка: {e}")
+        await streamer
+        raise
+    channel.close(text)
+    await streamer
+    return text
+
+
+async def start_job_with_progress(
+    message: types.Message,
+    kind: Hashable,
+    title: str,
+    job: Callable[[ProgressChannel], Awaitable[str]],
+    reply_markup: Any = None,
+) -> bool:
+    """
+    Queue `job` on the job runner and stream its progress into one edited status message.
+
+    The handler returns right away. Only one job of a kind runs per user; a repeated
+    tap gets a notice instead of a second scrape. `job` returns the final text.
+    """
+    status_message: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def run() -> str:
+        return await _run_with_progress(await status_message, title, job)
+
+    queued, created = job_runner.submit((message.from_user.id, kind), title, run, owner=message.from_user.id)
+    if not created:
+        await message.answer(f"Эта операция уже выполняется (задача {queued.id}).")
+        return False
+
+    try:
+        status_message.set_result(
+            await message.answer(f"{title}\nЗадача {queued.id}, отменить: /cancel {queued.id}", reply_markup=reply_markup))
+    except Exception:
+        job_runner.cancel(queued.id)
+        raise
+    return True
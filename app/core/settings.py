@@ -1,3 +1,4 @@
+import datetime
 import logging
 import os
 from dataclasses import dataclass, field
@@ -15,6 +16,87 @@ tz = pytz.timezone('Asia/Yekaterinburg')
 DIR_DATA = 'data'
 ENV_PATH = ".env"
 
+# Visiting sync pipeline: queue sizes bound the pages/batches held in memory
+SYNC_PAGE_QUEUE_SIZE = 4
+SYNC_BATCH_QUEUE_SIZE = 4
+SYNC_PARSE_WORKERS = 2
+SYNC_BATCH_SIZE = 5000
+# Deadlines (seconds) for one teacher's requests, not counting waits for a request
+# slot or the page queue, and for a single osu.ru request
+SYNC_TEACHER_TIMEOUT = 300
+SYNC_REQUEST_TIMEOUT = 60
+# Adaptive request windows: a group's range is split so one page stays under both
+# targets, judged from the page size and latency seen for that group so far
+SYNC_MAX_CONCURRENT_REQUESTS = 8
+SYNC_WINDOW_TARGET_BYTES = 1_000_000
+SYNC_WINDOW_TARGET_SECONDS = 10
+SYNC_WINDOW_DEFAULT_DAYS = 31
+SYNC_WINDOW_MIN_DAYS = 1
+
+# Headless sync workers (`main.py run-workers`). When enabled the bot only enqueues jobs.
+USE_SYNC_WORKERS = False
+SYNC_WORKER_POLL_INTERVAL = 5
+# Lease must outlive SYNC_TEACHER_TIMEOUT so a healthy worker never loses its job
+SYNC_JOB_LEASE_SECONDS = 600
+SYNC_JOB_MAX_ATTEMPTS = 3
+
+# Scheduled background sync: every teacher is synced once per interval at a slot
+# hashed from their id; groups synced within the freshness window are skipped
+SYNC_SCHEDULE_ENABLED = True
+SYNC_SCHEDULE_INTERVAL_MINUTES = 120
+SYNC_FRESHNESS_MINUTES = 60
+SYNC_SCHEDULE_LOOKBACK_DAYS = 7
+
+# Timetable-aware sync: osu.ru fills in visits after the bell, so a small sync of
+# today's window runs SYNC_AFTER_PAIR_DELAY_MINUTES after each pair ends (wall
+# clock in `tz`). Nothing is polled at night or on non-study weekdays (Mon=0).
+SYNC_TIMETABLE_ENABLED = True
+PAIR_END_TIMES = {
+    1: datetime.time(9, 30),
+    2: datetime.time(11, 10),
+    3: datetime.time(13, 0),
+    4: datetime.time(14, 40),
+    5: datetime.time(16, 20),
+    6: datetime.time(18, 0),
+    7: datetime.time(19, 40),
+    8: datetime.time(21, 20),
+}
+SYNC_AFTER_PAIR_DELAY_MINUTES = 15
+SYNC_AFTER_PAIR_SPREAD_MINUTES = 10
+SYNC_STUDY_WEEKDAYS = (0, 1, 2, 3, 4)
+# Past weeks checked for a group's usual pairs (two weeks cover alternating timetables)
+SYNC_TIMETABLE_HISTORY_WEEKS = 2
+
+# Historical backfill (`main.py backfill`): window size ("month" or "week"), pause
+# between windows and concurrent osu.ru requests, kept low to run in the background
+BACKFILL_WINDOW = "month"
+BACKFILL_PAUSE_SECONDS = 30
+BACKFILL_FETCH_CONCURRENCY = 1
+
+# Speculative prefetch into the report cache when a teacher opens an absences menu
+PREFETCH_ENABLED = True
+
+# Minimum seconds between edits of a job's Telegram status message
+PROGRESS_EDIT_INTERVAL = 3
+
+# In-process job runner for heavy bot actions: worker pool size and finished jobs kept
+JOB_RUNNER_WORKERS = 4
+JOB_RUNNER_MAX_RESULTS = 200
+
+# Absence reports and their data kept in memory, keyed by the covered groups' generations
+REPORT_CACHE_SIZE = 256
+# Per-student attendance answers, kept apart so polling students do not evict teacher reports;
+# sized for one entry per student and period
+STUDENT_ATTENDANCE_CACHE_SIZE = 8192
+
+# Process pool that renders report files and summaries, and how many renders may be in flight
+REPORT_RENDER_WORKERS = 2
+REPORT_RENDER_QUEUE_LIMIT = 8
+
+# Columnar attendance export: rows fetched per server-side cursor batch and Parquet codec
+EXPORT_BATCH_SIZE = 50_000
+EXPORT_COMPRESSION = "zstd"
+
 @dataclass
 class DatabaseConfig:
     user: str = ""
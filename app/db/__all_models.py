@@ -1,6 +1,10 @@
 from .models.groups import Group
 from .models.users import User, Student, Teacher
-from .models.absences import Visiting
+from .models.absences import Visiting, VisitingStatusChange
 from .models.pairs import Pair
 from .models.group_pair import group_pair_association
 from .models.group_attendance_log import GroupAttendanceLog
+from .models.sync_jobs import SyncJob
+from .models.backfill import BackfillCheckpoint
+from .models.daily_attendance import DailyAttendance
+from .models.group_generations import GroupGeneration
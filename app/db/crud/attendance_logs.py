@@ -0,0 +1,68 @@
+import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import desc, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.db_session import with_session
+from app.db.models.group_attendance_log import GroupAttendanceLog
+
+
+@with_session
+async def get_last_attendance_log(db_session: AsyncSession, group_id: int) -> Optional[GroupAttendanceLog]:
+    """Retrieves the most recent attendance log of a group."""
+    query = select(GroupAttendanceLog).filter_by(
+        group_id=group_id).order_by(desc(GroupAttendanceLog.last_parsed_at))
+    return (await db_session.execute(query)).scalars().first()
+
+
+@with_session
+async def record_attendance_log(
+    db_session: AsyncSession,
+    group_id: int,
+    last_parsed_at: datetime.datetime,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    log_id: Optional[int] = None,
+) -> None:
+    """Sets the sync time and logged range of an existing attendance log or creates the first one for a group."""
+    if log_id is not None:
+        await db_session.execute(
+            update(GroupAttendanceLog).where(GroupAttendanceLog.id == log_id).values(
+                last_parsed_at=last_parsed_at, start_date=start_date, end_date=end_date))
+    else:
+        db_session.add(GroupAttendanceLog(
+            group_id=group_id, last_parsed_at=last_parsed_at, start_date=start_date, end_date=end_date))
+
+
+@with_session
+async def rewind_attendance_log(db_session: AsyncSession, group_id: int, end_date: datetime.date) -> None:
+    """Moves the end of the group's logged ranges back to `end_date`, so the days after it are fetched again."""
+    end = datetime.datetime.combine(end_date, datetime.time())
+    await db_session.execute(
+        update(GroupAttendanceLog)
+        .where(GroupAttendanceLog.group_id == group_id, GroupAttendanceLog.end_date > end)
+        .values(end_date=end))
+
+
+@with_session
+async def get_groups_last_parsed(db_session: AsyncSession, group_ids: Iterable[int]) -> Dict[int, datetime.datetime]:
+    """Maps each group ID to its latest sync time; groups that were never synced are absent."""
+    query = select(GroupAttendanceLog.group_id, func.max(GroupAttendanceLog.last_parsed_at)).where(
+        GroupAttendanceLog.group_id.in_(list(group_ids))).group_by(GroupAttendanceLog.group_id)
+    return {group_id: last_parsed_at for group_id, last_parsed_at in await db_session.execute(query) if last_parsed_at}
+
+
+@with_session
+async def get_groups_sync_state(
+    db_session: AsyncSession, group_ids: Iterable[int]
+) -> Dict[int, Tuple[Optional[datetime.datetime], Optional[datetime.datetime], Optional[datetime.datetime]]]:
+    """Maps each group ID to its latest sync time and the latest start and end of its logged ranges."""
+    query = select(
+        GroupAttendanceLog.group_id,
+        func.max(GroupAttendanceLog.last_parsed_at),
+        func.max(GroupAttendanceLog.start_date),
+        func.max(GroupAttendanceLog.end_date),
+    ).where(GroupAttendanceLog.group_id.in_(list(group_ids))).group_by(GroupAttendanceLog.group_id)
+    return {
+        group_id: (last_parsed_at, start_date, end_date)
+        for group_id, last_parsed_at, start_date, end_date in await db_session.execute(query)
+    }
@@ -0,0 +1,42 @@
+import datetime
+from typing import Dict, Iterable
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.db_session import with_session
+from app.db.models.backfill import BackfillCheckpoint
+
+
+@with_session
+async def get_backfill_progress(
+    db_session: AsyncSession, group_ids: Iterable[int], start_date: datetime.date
+) -> Dict[int, datetime.date]:
+    """Maps each group ID to the date its backfill from `start_date` is complete up to."""
+    query = select(BackfillCheckpoint.group_id, BackfillCheckpoint.done_until).where(
+        BackfillCheckpoint.group_id.in_(list(group_ids)),
+        BackfillCheckpoint.start_date == start_date,
+        BackfillCheckpoint.done_until.is_not(None),
+    )
+    return {group_id: done_until for group_id, done_until in await db_session.execute(query)}
+
+
+@with_session
+async def save_backfill_checkpoint(
+    db_session: AsyncSession, group_ids: Iterable[int], start_date: datetime.date, done_until: datetime.date
+) -> None:
+    """Records that the backfill of the groups from `start_date` is complete up to `done_until`."""
+    group_ids = set(group_ids)
+    now = datetime.datetime.now()
+    await db_session.execute(
+        update(BackfillCheckpoint)
+        .where(BackfillCheckpoint.group_id.in_(group_ids), BackfillCheckpoint.start_date == start_date)
+        .values(done_until=done_until, updated_at=now)
+    )
+    existing = set((await db_session.execute(
+        select(BackfillCheckpoint.group_id).where(
+            BackfillCheckpoint.group_id.in_(group_ids), BackfillCheckpoint.start_date == start_date)
+    )).scalars())
+    db_session.add_all(
+        BackfillCheckpoint(group_id=group_id, start_date=start_date, done_until=done_until, updated_at=now)
+        for group_id in group_ids - existing
+    )
+    await db_session.commit()
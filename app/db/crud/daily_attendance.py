@@ -0,0 +1,86 @@
+import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.crud.group_generations import bump_all_group_generations
+from app.db.db_session import with_session
+from app.db.queries import dialect_insert
+from app.db.models.absences import AttendanceStatus, Visiting
+from app.db.models.daily_attendance import DailyAttendance
+from app.db.models.pairs import Pair
+
+
+@with_session
+async def apply_daily_attendance_deltas(
+    db_session: AsyncSession, deltas: Dict[Tuple[int, datetime.date, AttendanceStatus], int]
+) -> None:
+    """
+    Adds ``(student_id, date, status) -> delta`` to the daily counts without committing.
+
+    Uses ``INSERT ... ON CONFLICT DO UPDATE``, so concurrent writers of the same day add up.
+    """
+    values = [
+        {"student_id": student_id, "date": date, "status": status, "count": delta}
+        for (student_id, date, status), delta in deltas.items() if delta
+    ]
+    if not values:
+        return
+    statement = dialect_insert(db_session, DailyAttendance)
+    await db_session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[DailyAttendance.student_id, DailyAttendance.date, DailyAttendance.status],
+            set_={"count": DailyAttendance.count + statement.excluded.count},
+        ),
+        values,
+    )
+
+
+def _date_range(column, start_date: Optional[datetime.date], end_date: Optional[datetime.date]) -> List:
+    conditions = []
+    if start_date:
+        conditions.append(column >= start_date)
+    if end_date:
+        conditions.append(column <= end_date)
+    return conditions
+
+
+@with_session
+async def rebuild_daily_attendance(
+    db_session: AsyncSession,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+) -> int:
+    """
+    Recomputes the daily counts from ``Visiting``, optionally for a date range only; returns the row count.
+
+    Every group generation is bumped, so cached reports built from the old counts are not served.
+    """
+    await db_session.execute(
+        delete(DailyAttendance).where(*_date_range(DailyAttendance.date, start_date, end_date)))
+    counts = (
+        select(Visiting.student_id, Pair.date, Visiting.status, func.count())
+        .join(Pair, Visiting.pair_id == Pair.id)
+        .where(*_date_range(Pair.date, start_date, end_date))
+        .group_by(Visiting.student_id, Pair.date, Visiting.status)
+    )
+    await db_session.execute(
+        insert(DailyAttendance).from_select(["student_id", "date", "status", "count"], counts))
+    await bump_all_group_generations(db_session=db_session)
+    await db_session.commit()
+    return await db_session.scalar(
+        select(func.count()).select_from(DailyAttendance)
+        .where(*_date_range(DailyAttendance.date, start_date, end_date)))
+
+
+@with_session
+async def ensure_daily_attendance(db_session: AsyncSession) -> Optional[int]:
+    """
+    Builds the daily counts when the table is empty but visits exist, e.g. on the first start after an upgrade.
+
+    Returns the row count if it was built, or None if there was nothing to do.
+    """
+    if await db_session.scalar(select(DailyAttendance.student_id).limit(1)) is not None:
+        return None
+    if await db_session.scalar(select(Visiting.id).limit(1)) is None:
+        return None
+    return await rebuild_daily_attendance(db_session=db_session)
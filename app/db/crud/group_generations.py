@@ -0,0 +1,32 @@
+from typing import Iterable
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.db_session import with_session
+from app.db.models.group_generations import GroupGeneration
+from app.db.models.groups import Group
+from app.db.queries import dialect_insert
+from app.tools.support import local_now
+
+
+@with_session
+async def bump_group_generations(db_session: AsyncSession, group_ids: Iterable[int]) -> None:
+    """Increments the generation of each group without committing, so it lands with the change itself."""
+    now = local_now()
+    values = [{"group_id": group_id, "generation": 1, "updated_at": now} for group_id in sorted(set(group_ids))]
+    if not values:
+        return
+    statement = dialect_insert(db_session, GroupGeneration)
+    await db_session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[GroupGeneration.group_id],
+            set_={"generation": GroupGeneration.generation + 1, "updated_at": statement.excluded.updated_at},
+        ),
+        values,
+    )
+
+
+@with_session
+async def bump_all_group_generations(db_session: AsyncSession) -> None:
+    """Increments the generation of every group, for changes made outside the sync."""
+    await bump_group_generations(
+        db_session=db_session, group_ids=(await db_session.execute(select(Group.id))).scalars().all())
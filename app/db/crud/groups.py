@@ -1,8 +1,8 @@
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from async_lru import alru_cache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from app.db.db_session import with_session
 from app.db.models.groups import Group
 from sqlalchemy.orm import selectinload
@@ -40,3 +40,39 @@ async def get_or_create_group(db_session: AsyncSession,
             db_session=db_session, id_curator=id_curator,_id_group= _id_group,name= name
         )
 
+
+@with_session
+async def upsert_groups(db_session: AsyncSession, id_curator: int, groups: List[Dict[str, Any]]) -> Dict[int, int]:
+    """
+    Insert or update the groups parsed from a supervision page in one pass.
+
+    `groups` are ``{"id": _id_group, "name": name}`` dicts as returned by
+    ``GroupParser.parse_groups``. New groups get `id_curator`; existing groups
+    only take the new name and keep their curator, so a refresh by another teacher
+    does not move them. Returns a ``_id_group -> id`` map; no group relationships are loaded.
+    """
+    parsed = {group["id"]: group["name"] for group in groups}
+    if not parsed:
+        return {}
+
+    existing = (await db_session.execute(
+        select(Group.id, Group._id_group, Group.name).where(Group._id_group.in_(parsed))
+    )).all()
+    ids = {row._id_group: row.id for row in existing}
+
+    changed = [
+        {"id": row.id, "name": parsed[row._id_group]}
+        for row in existing
+        if row.name != parsed[row._id_group]
+    ]
+    if changed:
+        await db_session.execute(update(Group), changed)
+
+    new = [
+        {"_id_group": _id_group, "name": name, "id_curator": id_curator}
+        for _id_group, name in parsed.items() if _id_group not in ids
+    ]
+    if new:
+        result = await db_session.execute(insert(Group).returning(Group.id, Group._id_group), new)
+        ids.update({row._id_group: row.id for row in result})
+    return ids
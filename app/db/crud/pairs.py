@@ -1,12 +1,14 @@
 import datetime
 import logging
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from async_lru import alru_cache
 import pandas as pd
-from sqlalchemy import select
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.db_session import with_session
+from app.db.models.group_pair import group_pair_association
 from app.db.models.pairs import Pair
+from app.db.queries import dialect_insert
 
 
 @with_session
@@ -59,3 +61,64 @@ async def get_or_create_pair(
         return await create_pair(db_session=db_session, key_pair=key_pair, date=date, pair_number=pair_number, discipline=discipline)
 
     return None
+
+
+@with_session
+async def get_or_create_pairs(db_session: AsyncSession, pairs: List[Dict[str, Any]]) -> Dict[int, Row]:
+    """
+    Maps each key_pair to the id and date of its pair, inserting the missing pairs without committing.
+
+    Rows that hit ``unique_pair`` are skipped and selected afterwards, so a pair created
+    by a concurrent sync does not fail the batch.
+    """
+    query = select(Pair.id, Pair.key_pair, Pair.date)
+    key_pairs = [pair["key_pair"] for pair in pairs]
+    found = {row.key_pair: row for row in await db_session.execute(query.where(Pair.key_pair.in_(key_pairs)))}
+    if missing := [pair for pair in pairs if pair["key_pair"] not in found]:
+        await db_session.execute(
+            dialect_insert(db_session, Pair).on_conflict_do_nothing(
+                index_elements=[Pair.date, Pair.pair_number, Pair.discipline]),
+            missing,
+        )
+        missing_keys = [pair["key_pair"] for pair in missing]
+        found.update(
+            (row.key_pair, row) for row in await db_session.execute(query.where(Pair.key_pair.in_(missing_keys))))
+    return found
+
+
+@with_session
+async def link_pairs_to_groups(db_session: AsyncSession, links: Iterable[Tuple[int, int]]) -> int:
+    """
+    Adds the missing ``(group_id, pair_id)`` rows to ``group_pair`` without committing; returns how many were added.
+
+    Existing links are read from the association table itself, so no group or pair is loaded.
+    """
+    links = set(links)
+    if not links:
+        return 0
+    query = select(group_pair_association.c.group_id, group_pair_association.c.pair_id).where(
+        group_pair_association.c.pair_id.in_({pair_id for _, pair_id in links}))
+    missing = links.difference(tuple(row) for row in await db_session.execute(query))
+    if missing:
+        await db_session.execute(
+            dialect_insert(db_session, group_pair_association).on_conflict_do_nothing(),
+            [{"group_id": group_id, "pair_id": pair_id} for group_id, pair_id in sorted(missing)],
+        )
+    return len(missing)
+
+
+@with_session
+async def get_group_pair_numbers(
+    db_session: AsyncSession, group_ids: Iterable[int], dates: Iterable[datetime.date]
+) -> Dict[int, Set[int]]:
+    """Maps each group ID to the pair numbers it had on the given dates; groups without pairs are absent."""
+    query = (
+        select(group_pair_association.c.group_id, Pair.pair_number)
+        .join(Pair, Pair.id == group_pair_association.c.pair_id)
+        .where(group_pair_association.c.group_id.in_(list(group_ids)), Pair.date.in_(list(dates)))
+        .distinct()
+    )
+    pair_numbers: Dict[int, Set[int]] = {}
+    for group_id, pair_number in await db_session.execute(query):
+        pair_numbers.setdefault(group_id, set()).add(pair_number)
+    return pair_numbers
@@ -0,0 +1,152 @@
+import datetime
+from typing import List, Optional
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.db_session import with_session
+from app.db.models.sync_jobs import SyncJob, SyncJobStatus
+
+
+def _claimable(now: datetime.datetime, max_attempts: int):
+    """Pending jobs, or running jobs whose worker let the lease expire."""
+    return and_(
+        SyncJob.attempts < max_attempts,
+        or_(
+            SyncJob.status == SyncJobStatus.PENDING,
+            and_(SyncJob.status == SyncJobStatus.RUNNING, SyncJob.lease_expires_at < now),
+        ),
+    )
+
+
+@with_session
+async def enqueue_sync_job(
+    db_session: AsyncSession,
+    teacher_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    group_id: Optional[int] = None,
+) -> SyncJob:
+    """Creates a pending sync job, reusing an identical one that is still pending."""
+    existing = (await db_session.execute(
+        select(SyncJob).filter_by(
+            teacher_id=teacher_id, group_id=group_id, start_date=start_date,
+            end_date=end_date, status=SyncJobStatus.PENDING,
+        ).limit(1)
+    )).scalar_one_or_none()
+    if existing:
+        return existing
+
+    job = SyncJob(
+        teacher_id=teacher_id,
+        group_id=group_id,
+        start_date=start_date,
+        end_date=end_date,
+        status=SyncJobStatus.PENDING,
+        attempts=0,
+        created_at=datetime.datetime.now(),
+    )
+    db_session.add(job)
+    await db_session.commit()
+    return job
+
+
+@with_session
+async def claim_sync_job(
+    db_session: AsyncSession, worker_id: str, lease_seconds: int, max_attempts: int
+) -> Optional[SyncJob]:
+    """
+    Leases the oldest claimable job to a worker.
+
+    Running jobs whose lease expired after their last attempt are marked failed
+    first, so they do not stay running forever. On PostgreSQL the candidate row is locked with ``FOR UPDATE SKIP LOCKED`` so
+    concurrent workers pick different rows. SQLite ignores the lock clause, so
+    the guarded UPDATE is what decides the race: a worker that loses it gets None
+    and simply polls again.
+    """
+    now = datetime.datetime.now()
+    exhausted = await db_session.execute(
+        update(SyncJob)
+        .where(
+            SyncJob.status == SyncJobStatus.RUNNING,
+            SyncJob.lease_expires_at < now,
+            SyncJob.attempts >= max_attempts,
+        )
+        .values(
+            status=SyncJobStatus.FAILED,
+            finished_at=now,
+            lease_expires_at=None,
+            result=f"Lease expired after {max_attempts} attempts.",
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if exhausted.rowcount:
+        await db_session.commit()
+
+    candidate = (
+        select(SyncJob.id)
+        .where(_claimable(now, max_attempts))
+        .order_by(SyncJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = (await db_session.execute(candidate)).scalar_one_or_none()
+    if job_id is None:
+        return None
+
+    claimed = await db_session.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job_id, _claimable(now, max_attempts))
+        .values(
+            status=SyncJobStatus.RUNNING,
+            leased_by=worker_id,
+            lease_expires_at=now + datetime.timedelta(seconds=lease_seconds),
+            attempts=SyncJob.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        await db_session.rollback()
+        return None
+
+    await db_session.commit()
+    return await db_session.get(SyncJob, job_id)
+
+
+@with_session
+async def renew_sync_job_lease(db_session: AsyncSession, job_id: int, worker_id: str, lease_seconds: int) -> bool:
+    """Extends the lease of a running job; returns False if the worker no longer holds it."""
+    renewed = await db_session.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job_id, SyncJob.leased_by == worker_id, SyncJob.status == SyncJobStatus.RUNNING)
+        .values(lease_expires_at=datetime.datetime.now() + datetime.timedelta(seconds=lease_seconds))
+    )
+    return renewed.rowcount == 1
+
+
+@with_session
+async def finish_sync_job(
+    db_session: AsyncSession, job_id: int, worker_id: str, status: SyncJobStatus, result: Optional[str] = None
+) -> None:
+    """Marks a leased job as done or failed, unless another worker has taken it over."""
+    await db_session.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job_id, SyncJob.leased_by == worker_id)
+        .values(
+            status=status,
+            finished_at=datetime.datetime.now(),
+            lease_expires_at=None,
+            result=result[:2000] if result else None,
+        )
+    )
+
+
+@with_session
+async def get_sync_job(db_session: AsyncSession, job_id: int) -> Optional[SyncJob]:
+    """Retrieves a sync job by ID."""
+    return await db_session.get(SyncJob, job_id)
+
+
+@with_session
+async def get_recent_sync_jobs(db_session: AsyncSession, limit: int = 10) -> List[SyncJob]:
+    """Retrieves the most recently created sync jobs."""
+    result = await db_session.execute(select(SyncJob).order_by(SyncJob.id.desc()).limit(limit))
+    return list(result.scalars())
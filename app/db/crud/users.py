@@ -1,11 +1,13 @@
 import logging
-from typing import Optional, List, Tuple, Type, TypeVar, Union
+from typing import Any, Dict, Iterable, Optional, List, Tuple, Type, TypeVar, Union
 
 from async_lru import alru_cache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import Select, delete, select
+from sqlalchemy import Row, Select, and_, delete, func, insert, or_, select, update
 from sqlalchemy.orm import selectinload
 from app.db.db_session import get_session, with_session
+from app.db.models.group_generations import GroupGeneration
+from app.db.models.groups import Group
 from app.db.models.users import Student, Teacher, User, UserRole
 from app.db.queries import UniversalQueryService
 from app.tools.support import timeit
@@ -29,6 +31,13 @@ async def get_teacher(db_session: AsyncSession, telegram_id: Optional[int], rela
     return result.scalars().first()
 
 
+@with_session
+async def get_teacher_by_id(db_session: AsyncSession, teacher_id: int) -> Optional[Teacher]:
+    """Retrieve teacher by primary key."""
+    result = await db_session.execute(select(Teacher).where(Teacher.id == teacher_id))
+    return result.scalars().first()
+
+
 @with_session
 async def get_student(
         db_session: AsyncSession,
@@ -53,6 +62,62 @@ async def get_student(
     return result.scalars().first()
 
 
+@with_session
+async def get_roster_students(
+    db_session: AsyncSession, kodstuds: Iterable[int], full_names: Iterable[str] = ()
+) -> List[Row]:
+    """
+    Id, kodstud, id_stud, full name and group of the students on a fetched roster.
+
+    Students are matched by kodstud; rows saved without one are matched by full name.
+    Only columns are selected, so no visits or groups are loaded.
+    """
+    kodstuds, full_names = list(set(kodstuds)), list(set(full_names))
+    if not kodstuds and not full_names:
+        return []
+    query = select(Student.id, Student.kodstud, Student.id_stud, Student.full_name, Student.group_id).where(
+        or_(
+            Student.kodstud.in_(kodstuds),
+            and_(Student.kodstud.is_(None), Student.full_name.in_(full_names)),
+        )
+    )
+    return list((await db_session.execute(query)).all())
+
+
+@with_session
+async def upsert_students(
+    db_session: AsyncSession,
+    new_students: List[Dict[str, Any]],
+    changed_students: List[Dict[str, Any]],
+) -> None:
+    """Insert and update students with one executemany each; `changed_students` rows carry the primary key."""
+    if new_students:
+        await db_session.execute(
+            insert(Student), [{**student, "role": UserRole.STUDENT} for student in new_students])
+    if changed_students:
+        await db_session.execute(update(Student), changed_students)
+
+
+@with_session
+async def get_student_card(db_session: AsyncSession, telegram_id: int) -> Optional[Row]:
+    """
+    Id, name, kodstud, group and group generation of the student with this Telegram ID.
+
+    Only columns are selected, so the student's visits are not loaded.
+    """
+    query = (
+        select(
+            Student.id, Student.full_name, Student.kodstud, Student.group_id,
+            Group.name.label("group_name"),
+            func.coalesce(GroupGeneration.generation, 0).label("generation"),
+        )
+        .outerjoin(Group, Student.group_id == Group.id)
+        .outerjoin(GroupGeneration, GroupGeneration.group_id == Student.group_id)
+        .where(Student.telegram_id == str(telegram_id))
+    )
+    return (await db_session.execute(query)).first()
+
+
 async def get_all_teachers() -> List[Teacher]:
     """Retrieve all teachers."""
     return await UniversalQueryService.get_entities(Teacher)
@@ -56,3 +56,25 @@ class Visiting(SqlAlchemyBase):
 
     def __repr__(self) -> str:
         return f"<Visiting(student_id={self.student_id}, pair_id={self.pair_id}, status={self.status})>"
+
+
+class VisitingStatusChange(SqlAlchemyBase):
+    """Append-only log of status corrections applied to existing visits."""
+
+    __tablename__ = "visiting_status_changes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    visiting_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(column="visiting.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    student_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    pair_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    old_status: Mapped[AttendanceStatus] = mapped_column(nullable=False)
+    new_status: Mapped[AttendanceStatus] = mapped_column(nullable=False)
+    changed_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return (
+            f"<VisitingStatusChange(visiting_id={self.visiting_id}, "
+            f"{self.old_status} -> {self.new_status}, changed_at={self.changed_at})>"
+        )
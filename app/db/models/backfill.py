@@ -0,0 +1,29 @@
+import datetime
+from typing import Optional
+from sqlalchemy import Date, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db_session import SqlAlchemyBase
+
+
+class BackfillCheckpoint(SqlAlchemyBase):
+    """Progress of a historical backfill of one group: every window up to `done_until` is saved."""
+
+    __tablename__ = "backfill_checkpoints"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    group_id: Mapped[int] = mapped_column(
+        ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    start_date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    done_until: Mapped[Optional[datetime.date]] = mapped_column(Date, nullable=True)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("group_id", "start_date", name="unique_backfill_checkpoint"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<BackfillCheckpoint(group_id={self.group_id}, start_date={self.start_date}, "
+            f"done_until={self.done_until})>"
+        )
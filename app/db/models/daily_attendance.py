@@ -0,0 +1,31 @@
+import datetime
+from sqlalchemy import Date, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db_session import SqlAlchemyBase
+from .absences import AttendanceStatus
+
+
+class DailyAttendance(SqlAlchemyBase):
+    """
+    Number of a student's visits with one status on one day.
+
+    Derived from ``Visiting``: the sync persist stage keeps it up to date in the
+    same transaction as the visits, and ``rebuild_daily_attendance`` recomputes it.
+    """
+
+    __tablename__ = "daily_attendance"
+
+    student_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True
+    )
+    date: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    status: Mapped[AttendanceStatus] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("idx_daily_attendance_date", "date"),)
+
+    def __repr__(self) -> str:
+        return (
+            f"<DailyAttendance(student_id={self.student_id}, date={self.date}, "
+            f"status={self.status}, count={self.count})>"
+        )
@@ -0,0 +1,19 @@
+import datetime
+from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db_session import SqlAlchemyBase
+
+
+class GroupGeneration(SqlAlchemyBase):
+    """Counter bumped whenever the stored attendance or roster of a group changes; versions cached reports."""
+
+    __tablename__ = "group_generations"
+
+    group_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True
+    )
+    generation: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<GroupGeneration(group_id={self.group_id}, generation={self.generation})>"
@@ -0,0 +1,48 @@
+import datetime
+from enum import Enum as PyEnum, auto
+from typing import Optional
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, String, Enum
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db_session import SqlAlchemyBase
+
+
+class SyncJobStatus(PyEnum):
+    PENDING = auto()
+    RUNNING = auto()
+    DONE = auto()
+    FAILED = auto()
+
+
+class SyncJob(SqlAlchemyBase):
+    """Visiting sync job claimed by headless workers under a time-limited lease."""
+
+    __tablename__ = "sync_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    teacher_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    group_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("groups.id", ondelete="CASCADE"), nullable=True
+    )
+    start_date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    end_date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    status: Mapped[SyncJobStatus] = mapped_column(
+        Enum(SyncJobStatus), nullable=False, default=SyncJobStatus.PENDING
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    leased_by: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+    result: Mapped[Optional[str]] = mapped_column(String(2000), nullable=True)
+
+    __table_args__ = (
+        Index("idx_sync_jobs_claim", "status", "lease_expires_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<SyncJob(id={self.id}, teacher_id={self.teacher_id}, group_id={self.group_id}, "
+            f"{self.start_date}..{self.end_date}, status={self.status})>"
+        )
@@ -3,6 +3,7 @@ from typing import Optional, List, Tuple, Type, TypeVar, Union
 
 from sqlalchemy import Result, Select, Sequence, select
 from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 from async_lru import alru_cache
 
@@ -12,6 +13,11 @@ from app.db.db_session import get_session
 ModelType = TypeVar("ModelType")
 
 
+def dialect_insert(db_session: AsyncSession, model: Type[ModelType]):
+    """An INSERT for the session's dialect, which supports ``on_conflict_do_update`` on PostgreSQL and SQLite."""
+    return (postgresql if db_session.bind.dialect.name == "postgresql" else sqlite).insert(model)
+
+
 class UniversalQueryService:
     @classmethod
     @alru_cache(maxsize=128,ttl=30)
@@ -1,6 +1,7 @@
 import logging
 from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.db.crud.group_generations import bump_all_group_generations
 from app.db.db_session import with_session
 from .__all_models import *
 @with_session
@@ -10,6 +11,9 @@ async def clear_database(db_session: AsyncSession, preserve_user_id: int = 1):
     try:
         
 
+        await db_session.execute(delete(VisitingStatusChange))
+        await db_session.execute(delete(BackfillCheckpoint))
+        await db_session.execute(delete(DailyAttendance))
         await db_session.execute(delete(Visiting))
         await db_session.execute(
             delete(group_pair_association)
@@ -17,6 +21,7 @@ async def clear_database(db_session: AsyncSession, preserve_user_id: int = 1):
         await db_session.execute(delete(Pair))
         await db_session.execute(delete(Student).where(Student.id != preserve_user_id))
         await db_session.execute(delete(Teacher).where(Teacher.id != preserve_user_id))
+        await db_session.execute(delete(GroupGeneration))
         await db_session.execute(delete(Group))  
         await db_session.execute(delete(User).where(User.id != preserve_user_id))
 
@@ -34,6 +39,9 @@ async def test_visiting(db_session: AsyncSession, preserve_user_id: int = 1):
     try:
         
 
+        await db_session.execute(delete(VisitingStatusChange))
+        await db_session.execute(delete(BackfillCheckpoint))
+        await db_session.execute(delete(DailyAttendance))
         await db_session.execute(delete(Visiting))
         await db_session.execute(
             delete(group_pair_association)
@@ -42,6 +50,7 @@ async def test_visiting(db_session: AsyncSession, preserve_user_id: int = 1):
             delete(GroupAttendanceLog)
         )   
         await db_session.execute(delete(Pair))
+        await bump_all_group_generations(db_session=db_session)
 
         await db_session.commit()
         logging.info("Database cleared successfully (except for preserved user).")
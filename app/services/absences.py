@@ -0,0 +1,141 @@
+import datetime
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from aiohttp import ClientError
+
+from app.core.settings import SYNC_FRESHNESS_MINUTES, SYNC_TEACHER_TIMEOUT, USE_SYNC_WORKERS
+from app.db.crud.sync_jobs import enqueue_sync_job
+from app.db.crud.users import get_teacher
+from app.services.jobs import PRIORITY_LOW, JobStatus, job_runner
+from app.services.sync_worker import wait_for_sync_jobs
+from app.services.teacher import TeacherDataService
+from app.services.visiting import VisitingSyncPipeline, request_slots
+from app.session.session_manager import check_website_access
+from app.tools.support import local_now
+
+logger = logging.getLogger(__name__)
+
+def is_stale(group_data: Dict[str, Any], start_date: datetime.date, end_date: datetime.date) -> bool:
+    """
+    A group is stale if it was not synced within the freshness window or its log does not span the range.
+
+    The log end is checked as well because a failed save rewinds it without touching the sync time.
+    """
+    now = local_now()
+    parsed_at = group_data["last_parsed_at"]
+    if parsed_at is None or now - parsed_at.replace(tzinfo=None) > datetime.timedelta(minutes=SYNC_FRESHNESS_MINUTES):
+        return True
+    log_start_date, log_end_date = group_data["log_start_date"], group_data["log_end_date"]
+    if log_end_date is not None and log_end_date.date() < min(end_date, now.date()):
+        return True
+    return log_start_date is not None and log_start_date.date() > start_date
+
+
+def stale_group_ids(
+    absences_data: Dict[str, Dict[str, Any]], start_date: datetime.date, end_date: datetime.date
+) -> Set[int]:
+    return {
+        group_data["group_id"] for group_data in absences_data.values() if is_stale(group_data, start_date, end_date)
+    }
+
+
+def absence_totals(absences_data: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[int, int]]:
+    """Per group and student absence counts, used to tell whether a refresh changed anything."""
+    return {
+        group_name: {student_id: student_data["total"] for student_id, student_data in group_data["data"].items()}
+        for group_name, group_data in absences_data.items()
+    }
+
+
+def report_generations(absences_data: Dict[str, Dict[str, Any]]) -> Tuple[Tuple[int, int], ...]:
+    """The (group id, generation) pairs a report was built from, for report cache keys."""
+    return tuple((group_data["group_id"], group_data["generation"]) for group_data in absences_data.values())
+
+
+async def refresh_groups(
+    teacher_telegram_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    group_ids: Iterable[int],
+    fetch_concurrency: Optional[int] = None,
+) -> None:
+    """
+    Sync the given groups of a teacher and return once the data is saved.
+
+    The group attendance logs narrow each request down to the part of the range
+    that was not fetched yet.
+    """
+    teacher = await get_teacher(telegram_id=teacher_telegram_id)
+    if not teacher:
+        return
+    group_ids = set(group_ids)
+
+    if USE_SYNC_WORKERS:
+        jobs = [
+            await enqueue_sync_job(teacher_id=teacher.id, start_date=start_date, end_date=end_date, group_id=group_id)
+            for group_id in group_ids
+        ]
+        if not await wait_for_sync_jobs([job.id for job in jobs], timeout=SYNC_TEACHER_TIMEOUT * 2):
+            raise TimeoutError("Sync jobs did not finish in time.")
+        return
+
+    if not await check_website_access():
+        raise ClientError("Website is not accessible.")
+    await VisitingSyncPipeline(
+        start_date, end_date, group_ids=group_ids, fetch_concurrency=fetch_concurrency).run([teacher])
+
+
+def start_background_refresh(teacher_telegram_id: int, func: Callable[[], Awaitable[None]]) -> bool:
+    """Queue `func` on the job runner unless a refresh for this teacher is already active."""
+    _, created = job_runner.submit(
+        ("absences-refresh", teacher_telegram_id), "Absences refresh", func, owner=teacher_telegram_id)
+    return created
+
+
+async def prefetch_absences(teacher_telegram_id: int, windows: List[Tuple[datetime.date, datetime.date]]) -> None:
+    """
+    Speculatively refresh and load the windows a teacher is likely to pick next.
+
+    Runs at low priority: it is skipped while osu.ru requests are already queued
+    on the process-wide limit, and it fetches one page at a time. Loading the
+    windows in both formats warms ``report_cache``, which is keyed by the groups'
+    generations, so a sync or roster change after the prefetch is never hidden.
+    """
+    if not windows:
+        return
+
+    start_date = min(window[0] for window in windows)
+    end_date = max(window[1] for window in windows)
+    if not request_slots().locked():
+        absences_data = await TeacherDataService.fetch_student_absences(teacher_telegram_id, start_date, end_date)
+        if stale_ids := stale_group_ids(absences_data, start_date, end_date):
+            await refresh_groups(teacher_telegram_id, start_date, end_date, stale_ids, fetch_concurrency=1)
+
+    for window in windows:
+        for by_date in (False, True):
+            await TeacherDataService.fetch_student_absences(teacher_telegram_id, *window, by_date=by_date)
+
+
+def start_prefetch(teacher_telegram_id: int, windows: List[Tuple[datetime.date, datetime.date]]) -> bool:
+    """Queue `prefetch_absences` at low priority unless one is already active for this teacher."""
+    _, created = job_runner.submit(
+        ("prefetch", teacher_telegram_id), "Absences prefetch",
+        lambda: prefetch_absences(teacher_telegram_id, windows),
+        owner=teacher_telegram_id, priority=PRIORITY_LOW,
+    )
+    return created
+
+
+async def wait_for_prefetch(teacher_telegram_id: int) -> None:
+    """
+    Wait for a running prefetch of this teacher, so a refresh does not repeat its requests.
+
+    A prefetch that is still queued is cancelled instead: the caller is about to do
+    the same work, and waiting for a queued job from inside a job could deadlock the pool.
+    """
+    if job := job_runner.find(("prefetch", teacher_telegram_id)):
+        if job.status == JobStatus.QUEUED:
+            job_runner.cancel(job.id)
+        else:
+            await job_runner.wait(job)
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+import logging
+from typing import List, Optional, Tuple
+
+from app.core.settings import BACKFILL_FETCH_CONCURRENCY, BACKFILL_PAUSE_SECONDS, BACKFILL_WINDOW, tz
+from app.db.crud.backfill import get_backfill_progress, save_backfill_checkpoint
+from app.db.crud.users import get_all_teachers, get_teacher
+from app.db.models.users import Teacher
+from app.services.visiting import VisitingSyncPipeline
+from app.session.session_manager import require_website_access
+
+logger = logging.getLogger(__name__)
+
+
+def split_windows(
+    start_date: datetime.date, end_date: datetime.date, window: str = BACKFILL_WINDOW
+) -> List[Tuple[datetime.date, datetime.date]]:
+    """Split a date range into calendar months or Monday-based weeks, clipped to the range."""
+    if window not in ("month", "week"):
+        raise ValueError(f"Unknown backfill window: {window}")
+
+    windows = []
+    current = start_date
+    while current <= end_date:
+        if window == "month":
+            next_start = (current.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        else:
+            next_start = current + datetime.timedelta(days=7 - current.weekday())
+        windows.append((current, min(next_start - datetime.timedelta(days=1), end_date)))
+        current = next_start
+    return windows
+
+
+class HistoryBackfill:
+    """
+    Historical attendance import in small windows with a checkpoint after each one.
+
+    Teachers are processed one at a time, and every window runs a pipeline limited to
+    the groups whose checkpoint has not reached it yet. A window is checkpointed
+    only when all of its groups were fetched, parsed and saved, so a failed, timed-out
+    or interrupted run resumes from the first window that was not saved completely.
+    """
+
+    def __init__(
+        self,
+        start_date: datetime.date,
+        end_date: Optional[datetime.date] = None,
+        window: str = BACKFILL_WINDOW,
+        pause_seconds: float = BACKFILL_PAUSE_SECONDS,
+        fetch_concurrency: int = BACKFILL_FETCH_CONCURRENCY,
+    ) -> None:
+        self.start_date = start_date
+        self.end_date = end_date or datetime.datetime.now(tz).date()
+        self.windows = split_windows(self.start_date, self.end_date, window)
+        self.pause_seconds = pause_seconds
+        self.fetch_concurrency = fetch_concurrency
+
+    async def run(self, teachers: List[Teacher]) -> None:
+        for teacher in teachers:
+            await self.backfill_teacher(teacher)
+
+    async def backfill_teacher(self, teacher: Teacher) -> None:
+        group_ids = {group.id for group in teacher.curated_groups}
+        progress = await get_backfill_progress(group_ids=group_ids, start_date=self.start_date)
+
+        for window_start, window_end in self.windows:
+            pending = {group_id for group_id in group_ids if progress.get(group_id, datetime.date.min) < window_end}
+            if not pending:
+                continue
+
+            stats = await VisitingSyncPipeline(
+                window_start, window_end, group_ids=pending, fetch_concurrency=self.fetch_concurrency,
+            ).run([teacher])
+            status = stats.teachers[teacher.id]
+            if not stats.complete:
+                logger.warning(
+                    f"Backfill of teacher {teacher.id} stopped at {window_start}..{window_end}: "
+                    f"{status.state}{f', {status.error}' if status.error else ''}, "
+                    f"{stats.failed_pages} pages not parsed, {stats.failed_records} records not saved.")
+                return
+
+            await save_backfill_checkpoint(group_ids=pending, start_date=self.start_date, done_until=window_end)
+            progress.update(dict.fromkeys(pending, window_end))
+            logger.info(
+                f"Backfilled teacher {teacher.id} {window_start}..{window_end}: "
+                f"{len(pending)} groups, {stats.saved} new records.")
+            await asyncio.sleep(self.pause_seconds)
+
+
+@require_website_access
+async def backfill_visiting(
+    start_date: datetime.date,
+    end_date: Optional[datetime.date] = None,
+    window: str = BACKFILL_WINDOW,
+    teacher_telegram_id: Optional[int] = None,
+) -> None:
+    """Backfill attendance history for one teacher or all teachers, resuming from saved checkpoints."""
+    teachers = [await get_teacher(telegram_id=teacher_telegram_id)] if teacher_telegram_id else await get_all_teachers()
+    teachers = [teacher for teacher in teachers if teacher]
+    if not teachers:
+        logger.warning("No teachers found for backfill.")
+        return
+    await HistoryBackfill(start_date, end_date, window).run(teachers)
+    logger.info("Backfill finished.")
@@ -0,0 +1,114 @@
+import datetime
+import logging
+import os
+from typing import Dict, Optional
+
+from sqlalchemy import select
+
+from app.core.settings import EXPORT_BATCH_SIZE, EXPORT_COMPRESSION
+from app.db.db_session import get_session
+from app.db.models.absences import Visiting
+from app.db.models.groups import Group
+from app.db.models.pairs import Pair
+from app.db.models.users import Student
+
+logger = logging.getLogger(__name__)
+
+
+def _month_bounds(
+    start_date: Optional[datetime.date], end_date: Optional[datetime.date]
+) -> tuple[Optional[datetime.date], Optional[datetime.date]]:
+    """Widen the range to whole months, so every written partition is complete."""
+    if start_date:
+        start_date = start_date.replace(day=1)
+    if end_date:
+        next_month = (end_date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        end_date = next_month - datetime.timedelta(days=1)
+    return start_date, end_date
+
+
+async def export_attendance(
+    output_dir: str,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Export every visit, joined with its pair, student and group, to Parquet files partitioned by month.
+
+    Rows are streamed from a server-side cursor in batches of `batch_size` and
+    written as row groups, so memory use does not grow with the history. Each
+    month becomes ``<output_dir>/month=YYYY-MM/attendance.parquet``; exporting a
+    month again replaces its file. Returns the number of rows per month.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("The attendance export needs pyarrow: pip install pyarrow") from e
+
+    schema = pa.schema([
+        ("visiting_id", pa.int64()),
+        ("date", pa.date32()),
+        ("pair_number", pa.int32()),
+        ("discipline", pa.string()),
+        ("status", pa.string()),
+        ("message", pa.string()),
+        ("student_id", pa.int64()),
+        ("student_name", pa.string()),
+        ("kodstud", pa.int64()),
+        ("group_id", pa.int64()),
+        ("group_name", pa.string()),
+    ])
+    start_date, end_date = _month_bounds(start_date, end_date)
+    query = (
+        select(
+            Visiting.id, Pair.date, Pair.pair_number, Pair.discipline, Visiting.status, Visiting.message,
+            Student.id, Student.full_name, Student.kodstud, Group.id, Group.name,
+        )
+        .join(Pair, Visiting.pair_id == Pair.id)
+        .join(Student, Visiting.student_id == Student.id)
+        .outerjoin(Group, Student.group_id == Group.id)
+        .order_by(Pair.date, Visiting.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if start_date:
+        query = query.where(Pair.date >= start_date)
+    if end_date:
+        query = query.where(Pair.date <= end_date)
+
+    counts: Dict[str, int] = {}
+    month, writer = None, None
+    try:
+        async with get_session() as db_session:
+            result = await db_session.stream(query)
+            async for rows in result.partitions():
+                columns = list(zip(*rows))
+                columns[4] = [status.name for status in columns[4]]
+                months = [f"{day.year:04d}-{day.month:02d}" for day in columns[1]]
+
+                # Rows are ordered by date, so a batch holds a run of one or more months
+                start = 0
+                while start < len(rows):
+                    end = start
+                    while end < len(rows) and months[end] == months[start]:
+                        end += 1
+                    if months[start] != month:
+                        if writer:
+                            writer.close()
+                        month = months[start]
+                        path = os.path.join(output_dir, f"month={month}", "attendance.parquet")
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        writer = pq.ParquetWriter(path, schema, compression=EXPORT_COMPRESSION)
+                    writer.write_table(pa.Table.from_arrays(
+                        [pa.array(column[start:end], type=field.type) for column, field in zip(columns, schema)],
+                        schema=schema,
+                    ))
+                    counts[month] = counts.get(month, 0) + end - start
+                    start = end
+    finally:
+        if writer:
+            writer.close()
+
+    logger.info(f"Exported {sum(counts.values())} visits in {len(counts)} monthly partitions to {output_dir}.")
+    return counts
@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+import itertools
+import logging
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.settings import JOB_RUNNER_MAX_RESULTS, JOB_RUNNER_WORKERS, tz
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 10
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class Job:
+    id: str
+    key: Hashable
+    name: str
+    owner: Optional[int]
+    priority: int
+    func: Callable[[], Awaitable[Any]] = field(repr=False)
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime.datetime = field(default_factory=lambda: datetime.datetime.now(tz))
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    result: Any = field(default=None, repr=False)
+    error: Optional[str] = None
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class JobRunner:
+    """
+    In-process runner for heavy bot work.
+
+    Jobs wait in a priority queue and run on a fixed pool of worker tasks, so a burst
+    of scrapes cannot starve the dispatcher. A job whose key matches an active job is
+    not queued twice. Finished jobs keep their result or error until
+    ``max_results`` newer jobs have finished.
+    """
+
+    def __init__(self, workers: int = JOB_RUNNER_WORKERS, max_results: int = JOB_RUNNER_MAX_RESULTS) -> None:
+        self.workers = workers
+        self.max_results = max_results
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[Hashable, Job] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker(), name=f"job-worker-{index}") for index in range(self.workers)]
+
+    def submit(
+        self,
+        key: Hashable,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        owner: Optional[int] = None,
+        priority: int = PRIORITY_HIGH,
+    ) -> Tuple[Job, bool]:
+        """Queue `func` unless a job with the same key is active; returns the job and whether it is new."""
+        if existing := self._active.get(key):
+            return existing, False
+
+        self._ensure_workers()
+        job = Job(id=uuid.uuid4().hex[:8], key=key, name=name, owner=owner, priority=priority, func=func)
+        self._jobs[job.id] = job
+        self._active[key] = job
+        self._queue.put_nowait((priority, next(self._sequence), job))
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def find(self, key: Hashable) -> Optional[Job]:
+        """The active job with this key, if any."""
+        return self._active.get(key)
+
+    def jobs(self, owner: Optional[int] = None) -> List[Job]:
+        """Known jobs, newest first, optionally only those of one owner."""
+        jobs = [job for job in self._jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    async def wait(self, job: Job) -> Job:
+        await job._done.wait()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it has already finished."""
+        job = self._jobs.get(job_id)
+        if not job or not job.active:
+            return False
+        if job.status == JobStatus.QUEUED:
+            self._finish(job, JobStatus.CANCELLED)
+        elif job._task:
+            job._task.cancel()
+        return True
+
+    def _finish(self, job: Job, status: JobStatus, result: Any = None, error: Optional[str] = None) -> None:
+        job.status, job.result, job.error = status, result, error
+        job.finished_at = datetime.datetime.now(tz)
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        job._done.set()
+
+        self._finished[job.id] = None
+        while len(self._finished) > self.max_results:
+            old_id, _ = self._finished.popitem(last=False)
+            self._jobs.pop(old_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            if job.status != JobStatus.QUEUED:
+                continue
+
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.datetime.now(tz)
+            job._task = asyncio.create_task(job.func(), name=f"job-{job.id}")
+            try:
+                result = await asyncio.shield(job._task)
+            except asyncio.CancelledError:
+                if not job._task.cancelled():
+                    # The worker itself is being shut down
+                    job._task.cancel()
+                    self._finish(job, JobStatus.CANCELLED)
+                    raise
+                self._finish(job, JobStatus.CANCELLED)
+                logger.info(f"Job {job.id} ({job.name}) cancelled.")
+            except Exception as e:
+                self._finish(job, JobStatus.FAILED, error=f"{type(e).__name__}: {e}")
+                logger.error(f"Job {job.id} ({job.name}) failed: {e}", exc_info=True)
+            else:
+                self._finish(job, JobStatus.DONE, result=result)
+                logger.info(f"Job {job.id} ({job.name}) done in {job.finished_at - job.started_at}.")
+
+    async def shutdown(self) -> None:
+        """Cancel the workers and every job still running."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        for job in list(self._active.values()):
+            self._finish(job, JobStatus.CANCELLED)
+
+
+job_runner = JobRunner()
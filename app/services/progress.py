@@ -0,0 +1,39 @@
+import asyncio
+from typing import AsyncIterator
+
+
+class ProgressChannel:
+    """
+    Latest-value channel between a long-running job and whoever displays its progress.
+
+    The job publishes as often as it likes without ever waiting; the reader gets
+    only the newest text, at most once per `interval`, so intermediate updates are
+    dropped instead of queued.
+    """
+
+    def __init__(self, text: str = "") -> None:
+        self.text = text
+        self._initial = text
+        self.finished = False
+        self._changed = asyncio.Event()
+
+    def publish(self, text: str) -> None:
+        self.text = text
+        self._changed.set()
+
+    def close(self, text: str) -> None:
+        """Publish the final text; the reader stops after delivering it."""
+        self.finished = True
+        self.publish(text)
+
+    async def updates(self, interval: float) -> AsyncIterator[str]:
+        last = self._initial
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            if self.text != last:
+                last = self.text
+                yield last
+            if self.finished:
+                return
+            await asyncio.sleep(interval)
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.settings import REPORT_CACHE_SIZE
+
+
+class ReportCache:
+    """
+    Least-recently-used cache of rendered reports and report data.
+
+    Keys carry the generations of the groups a report covers, so an entry is never
+    invalidated explicitly: once new data lands, lookups use a new key and the old
+    entry ages out.
+    """
+
+    def __init__(self, max_size: int = REPORT_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+report_cache = ReportCache()
@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import xlsxwriter
+
+from app.core.settings import REPORT_RENDER_QUEUE_LIMIT, REPORT_RENDER_WORKERS
+from app.tools.support import local_now
+
+logger = logging.getLogger(__name__)
+
+_WORKBOOK_CREATED = datetime.datetime(2025, 1, 1)
+
+
+def format_data_age(parsed_at: Optional[datetime.datetime]) -> str:
+    if parsed_at is None:
+        return "данные ещё не загружались"
+    minutes = int((local_now() - parsed_at.replace(tzinfo=None)).total_seconds() // 60)
+    if minutes < 60:
+        age = f"{max(minutes, 0)} мин назад"
+    elif minutes < 60 * 24:
+        age = f"{minutes // 60} ч назад"
+    else:
+        age = f"{minutes // (60 * 24)} дн назад"
+    return f"данные обновлялись {parsed_at.strftime('%d-%m-%Y %H:%M')}, {age}"
+
+
+def build_absences_summary(absences_data: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Renders the text summary of absences, one message per group."""
+    messages = []
+    for group_name, group_data in absences_data.items():
+        caption = f"{group_name} ({format_data_age(group_data['last_parsed_at'])}):"
+
+        absences_text = f"{caption}\n"
+        students = group_data["data"]
+
+        if students:
+            absences_text += "\n".join(
+                f"  - {student_data['name']}: {student_data['total']} пропусков"
+                for student_data in students.values()
+            )
+        else:
+            absences_text += "  Пропусков нет."
+        messages.append(absences_text)
+    return messages
+
+
+def build_absences_workbook(absences_data: Dict[str, Dict[str, Any]]) -> bytes:
+    """
+    Renders the absences report into an in-memory workbook.
+
+    xlsxwriter runs in constant-memory mode, so each row is flushed as soon as the
+    next one starts and the rows must be written top to bottom. The creation time
+    is fixed so that the same data always produces the same bytes.
+    """
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    workbook.set_properties({"created": _WORKBOOK_CREATED})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+
+    for group_name, group_data in absences_data.items():
+        _create_group_worksheet(workbook, group_name, group_data, date_format)
+
+    workbook.close()
+    return output.getvalue()
+
+
+def _create_group_worksheet(workbook, group_name: str, group_data: dict, date_format):# -> Any:
+    """
+    Creates a worksheet for a specific group in the Excel file.
+
+    Cells are read from the per-date counts and the column totals are summed while
+    the rows are written, so the sheet takes one pass over the count matrix.
+    """
+    worksheet = workbook.add_worksheet(group_name)
+    students = group_data["data"]
+
+    dates = sorted({date_str for student_data in students.values() for date_str in student_data['dates']})
+
+    worksheet.write(0, 0, "Имя студента")
+    worksheet.write_row(0, 1, dates, date_format)
+    worksheet.write(0, len(dates) + 1, "Total")
+
+    column_totals = [0] * len(dates)
+    for row, data in enumerate(students.values(), start=1):
+        counts = [data['dates'].get(date_str, 0) for date_str in dates]
+        worksheet.write(row, 0, data['name'])
+        worksheet.write_row(row, 1, counts)
+        worksheet.write(row, len(dates) + 1, data['total'])
+        column_totals = [total + count for total, count in zip(column_totals, counts)]
+
+    last_row = len(students) + 1
+    worksheet.write(last_row, 0, "Grand Total")
+    worksheet.write_row(last_row, 1, column_totals)
+    worksheet.write(last_row, len(dates) + 1, sum(data['total'] for data in students.values()))
+
+    return worksheet
+
+
+class RenderQueueFull(RuntimeError):
+    """Raised when too many reports are already waiting for the render pool."""
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> Tuple[float, float, Any]:
+    started = time.time()
+    result = func(*args)
+    return started, time.time() - started, result
+
+
+class ReportRenderer:
+    """
+    Runs report rendering on a small process pool, off the event loop.
+
+    At most ``queue_limit`` renders are in flight; beyond that `render` raises
+    `RenderQueueFull` so the caller can answer right away instead of piling up
+    work. The queue wait and the render time of every job are logged.
+    """
+
+    def __init__(self, workers: int = REPORT_RENDER_WORKERS, queue_limit: int = REPORT_RENDER_QUEUE_LIMIT) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def render(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run the module-level function `func` with picklable `args` in the pool and return its result."""
+        if self._pending >= self.queue_limit:
+            raise RenderQueueFull(f"{self._pending} reports are already rendering.")
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+        self._pending += 1
+        submitted = time.time()
+        try:
+            started, elapsed, result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _timed, func, *args)
+        finally:
+            self._pending -= 1
+        logger.info(
+            f"Rendered {func.__name__} in {elapsed:.2f}s after {started - submitted:.2f}s in queue "
+            f"({self._pending} pending).")
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+report_renderer = ReportRenderer()
@@ -0,0 +1,234 @@
+import datetime
+import logging
+import zlib
+from typing import Iterable, Optional, Set
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.core.settings import (
+    PAIR_END_TIMES,
+    SYNC_AFTER_PAIR_DELAY_MINUTES,
+    SYNC_AFTER_PAIR_SPREAD_MINUTES,
+    SYNC_FRESHNESS_MINUTES,
+    SYNC_SCHEDULE_INTERVAL_MINUTES,
+    SYNC_SCHEDULE_LOOKBACK_DAYS,
+    SYNC_STUDY_WEEKDAYS,
+    SYNC_TIMETABLE_ENABLED,
+    SYNC_TIMETABLE_HISTORY_WEEKS,
+    USE_SYNC_WORKERS,
+    tz,
+)
+from app.db.crud.attendance_logs import get_groups_sync_state
+from app.db.crud.pairs import get_group_pair_numbers
+from app.db.crud.sync_jobs import enqueue_sync_job
+from app.db.crud.users import get_all_teachers, get_teacher_by_id
+from app.services.visiting import VisitingSyncPipeline
+from app.session.session_manager import check_website_access
+from app.tools.support import local_now
+
+logger = logging.getLogger(__name__)
+
+
+def slot_offset(teacher_id: int, interval: datetime.timedelta) -> datetime.timedelta:
+    """Stable offset of a teacher's sync inside the interval, so start times are spread evenly."""
+    return datetime.timedelta(seconds=zlib.crc32(str(teacher_id).encode()) % int(interval.total_seconds()))
+
+
+def pair_sync_time(pair_number: int) -> datetime.time:
+    """Wall-clock time in `tz` at which the sync after a pair starts."""
+    end = datetime.datetime.combine(datetime.date.min, PAIR_END_TIMES[pair_number])
+    return (end + datetime.timedelta(minutes=SYNC_AFTER_PAIR_DELAY_MINUTES)).time()
+
+
+def is_study_time(moment: datetime.datetime) -> bool:
+    """Whether new visits can appear on osu.ru: a study weekday between the first and last post-pair sync."""
+    moment = moment.astimezone(tz)
+    if moment.weekday() not in SYNC_STUDY_WEEKDAYS:
+        return False
+    day_end = datetime.datetime.combine(moment.date(), pair_sync_time(max(PAIR_END_TIMES))) + datetime.timedelta(
+        minutes=SYNC_AFTER_PAIR_SPREAD_MINUTES)
+    return min(PAIR_END_TIMES.values()) <= moment.time() <= day_end.time()
+
+
+class VisitingSyncScheduler:
+    """
+    Background attendance sync on a fixed cadence, plus timetable-aware syncs.
+
+    A planner job runs at every interval boundary and gives each teacher a one-off
+    job at ``boundary + slot_offset(teacher.id)``. When a slot comes up, only the
+    groups that were not synced within the freshness window are fetched, and a
+    teacher whose groups are all fresh is skipped entirely.
+
+    With ``SYNC_TIMETABLE_ENABLED`` a cron job fires shortly after every pair ends
+    and syncs just today's window for the groups that usually have that pair, and
+    interval slots falling on nights or weekends are dropped.
+    """
+
+    def __init__(
+        self,
+        interval_minutes: int = SYNC_SCHEDULE_INTERVAL_MINUTES,
+        freshness_minutes: int = SYNC_FRESHNESS_MINUTES,
+        lookback_days: int = SYNC_SCHEDULE_LOOKBACK_DAYS,
+    ) -> None:
+        self.interval = datetime.timedelta(minutes=interval_minutes)
+        self.freshness = datetime.timedelta(minutes=freshness_minutes)
+        self.lookback = datetime.timedelta(days=lookback_days)
+        self.scheduler = AsyncIOScheduler(timezone=tz)
+
+    def start(self) -> None:
+        """Start the scheduler; must be called from inside the running event loop."""
+        now = datetime.datetime.now(tz)
+        self.scheduler.add_job(
+            self.plan_cycle,
+            IntervalTrigger(seconds=self.interval.total_seconds(), start_date=self._cycle_start(now), timezone=tz),
+            id="visiting-sync-planner",
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+        )
+        # Plan the current cycle right away instead of waiting for the next boundary
+        self.scheduler.add_job(self.plan_cycle, id="visiting-sync-planner-startup", replace_existing=True)
+        if SYNC_TIMETABLE_ENABLED:
+            for pair_number in PAIR_END_TIMES:
+                sync_time = pair_sync_time(pair_number)
+                self.scheduler.add_job(
+                    self.plan_after_pair,
+                    CronTrigger(
+                        day_of_week=",".join(map(str, SYNC_STUDY_WEEKDAYS)),
+                        hour=sync_time.hour, minute=sync_time.minute, timezone=tz),
+                    args=[pair_number],
+                    id=f"pair-sync-planner-{pair_number}",
+                    coalesce=True,
+                    replace_existing=True,
+                )
+        self.scheduler.start()
+        logger.info(f"Visiting sync scheduler started with a {self.interval} interval.")
+
+    def shutdown(self) -> None:
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+
+    def _cycle_start(self, now: datetime.datetime) -> datetime.datetime:
+        interval_seconds = self.interval.total_seconds()
+        return datetime.datetime.fromtimestamp(now.timestamp() // interval_seconds * interval_seconds, tz)
+
+    async def plan_cycle(self) -> None:
+        """Schedule every teacher's slot for the current cycle, or the next one if it already passed."""
+        now = datetime.datetime.now(tz)
+        cycle_start = self._cycle_start(now)
+        teachers = [teacher for teacher in await get_all_teachers() if teacher.is_data_parsed]
+        for teacher in teachers:
+            run_at = cycle_start + slot_offset(teacher.id, self.interval)
+            if run_at < now:
+                run_at += self.interval
+            if SYNC_TIMETABLE_ENABLED and not is_study_time(run_at):
+                continue
+            self.scheduler.add_job(
+                self.sync_teacher,
+                DateTrigger(run_at, timezone=tz),
+                args=[teacher.id],
+                id=f"visiting-sync-{teacher.id}",
+                replace_existing=True,
+                misfire_grace_time=int(self.interval.total_seconds()),
+            )
+        logger.info(f"Planned visiting sync slots for {len(teachers)} teachers.")
+
+    async def plan_after_pair(self, pair_number: int) -> None:
+        """Spread today's post-pair syncs of all teachers over a short window."""
+        now = datetime.datetime.now(tz)
+        pair_end = tz.localize(datetime.datetime.combine(now.date(), PAIR_END_TIMES[pair_number]))
+        spread = datetime.timedelta(minutes=SYNC_AFTER_PAIR_SPREAD_MINUTES)
+        teachers = [teacher for teacher in await get_all_teachers() if teacher.is_data_parsed]
+        for teacher in teachers:
+            self.scheduler.add_job(
+                self.sync_after_pair,
+                DateTrigger(now + slot_offset(teacher.id, spread), timezone=tz),
+                args=[teacher.id, pair_number, pair_end],
+                id=f"pair-sync-{teacher.id}",
+                replace_existing=True,
+                misfire_grace_time=int(spread.total_seconds()),
+            )
+        logger.info(f"Planned syncs after pair {pair_number} for {len(teachers)} teachers.")
+
+    async def sync_after_pair(self, teacher_id: int, pair_number: int, pair_end: datetime.datetime) -> None:
+        """
+        Sync today's window for the groups that had this pair in recent weeks.
+
+        Groups with no pairs in the history are included, since their timetable is
+        unknown yet. A group synced after the bell already counts as fresh.
+        """
+        teacher = await get_teacher_by_id(teacher_id=teacher_id)
+        if not teacher:
+            return
+        today = pair_end.date()
+        history = [today - datetime.timedelta(weeks=week) for week in range(1, SYNC_TIMETABLE_HISTORY_WEEKS + 1)]
+        group_ids = {group.id for group in teacher.curated_groups}
+        pair_numbers = await get_group_pair_numbers(group_ids=group_ids, dates=history)
+        group_ids = {
+            group_id for group_id in group_ids
+            if group_id not in pair_numbers or pair_number in pair_numbers[group_id]
+        }
+        await self.sync_teacher(
+            teacher_id, start_date=today, end_date=today,
+            freshness=datetime.datetime.now(tz) - pair_end, group_ids=group_ids)
+
+    async def stale_groups(
+        self, group_ids: Set[int], end_date: datetime.date, freshness: Optional[datetime.timedelta] = None
+    ) -> Set[int]:
+        """
+        Groups whose last sync is older than the freshness window, that were never synced,
+        or whose log ends before `end_date` because a failed save rewound it.
+        """
+        if not group_ids:
+            return set()
+        now = local_now()
+        fresh_since = now - (self.freshness if freshness is None else freshness)
+        end_date = min(end_date, now.date())
+        sync_state = await get_groups_sync_state(group_ids=group_ids)
+        stale = set()
+        for group_id in group_ids:
+            last_parsed_at, _, log_end_date = sync_state.get(group_id, (None, None, None))
+            if (last_parsed_at is None or last_parsed_at.replace(tzinfo=None) < fresh_since
+                    or log_end_date is None or log_end_date.date() < end_date):
+                stale.add(group_id)
+        return stale
+
+    async def sync_teacher(
+        self,
+        teacher_id: int,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        freshness: Optional[datetime.timedelta] = None,
+        group_ids: Optional[Iterable[int]] = None,
+    ) -> None:
+        """Sync the stale groups of one teacher (optionally limited to `group_ids`), inline or through the worker queue."""
+        today = datetime.datetime.now(tz).date()
+        start_date = start_date or today - self.lookback
+        end_date = end_date or today
+
+        teacher = await get_teacher_by_id(teacher_id=teacher_id)
+        if not teacher:
+            return
+        candidates = {group.id for group in teacher.curated_groups}
+        if group_ids is not None:
+            candidates &= set(group_ids)
+        group_ids = await self.stale_groups(candidates, end_date, freshness)
+        if not group_ids:
+            logger.info(f"Skipping scheduled sync of teacher {teacher_id}: data is fresh.")
+            return
+
+        if USE_SYNC_WORKERS:
+            for group_id in group_ids:
+                await enqueue_sync_job(
+                    teacher_id=teacher_id, start_date=start_date, end_date=end_date, group_id=group_id)
+            logger.info(f"Queued scheduled sync of {len(group_ids)} groups of teacher {teacher_id}.")
+            return
+
+        if not await check_website_access():
+            logger.warning(f"Skipping scheduled sync of teacher {teacher_id}: website is not accessible.")
+            return
+        stats = await VisitingSyncPipeline(start_date, end_date, group_ids=group_ids).run([teacher])
+        logger.info(f"Scheduled sync of teacher {teacher_id}: {stats.saved} new, {stats.updated} changed records.")
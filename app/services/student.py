@@ -0,0 +1,86 @@
+import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import STUDENT_ATTENDANCE_CACHE_SIZE
+from app.db.crud.attendance_logs import get_groups_last_parsed
+from app.db.crud.users import get_student_card
+from app.db.db_session import with_session
+from app.db.models.absences import AttendanceStatus, Visiting
+from app.db.models.pairs import Pair
+from app.services.report_cache import ReportCache
+
+student_attendance_cache = ReportCache(STUDENT_ATTENDANCE_CACHE_SIZE)
+
+
+class StudentDataService:
+
+    @staticmethod
+    async def fetch_profile(telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Name, group and last sync time of a registered student."""
+        card = await get_student_card(telegram_id=telegram_id)
+        if not card:
+            return None
+        parsed = await get_groups_last_parsed(group_ids=[card.group_id]) if card.group_id else {}
+        return {
+            "full_name": card.full_name,
+            "kodstud": card.kodstud,
+            "group_name": card.group_name,
+            "last_parsed_at": parsed.get(card.group_id),
+        }
+
+    @staticmethod
+    @with_session
+    async def fetch_attendance(
+        telegram_id: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        db_session: AsyncSession,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        A student's attendance within a date range, per discipline.
+
+        The query walks the ``(student_id, pair_id)`` index of one student only.
+        Results are cached in ``student_attendance_cache`` under the generation of the
+        student's group, so repeated requests skip the database until a sync changes
+        that group::
+
+            {"full_name", "group_name", "disciplines": {discipline: {"total", "missed"}},
+             "missed_dates": [date, ...]}
+        """
+        card = await get_student_card(db_session=db_session, telegram_id=telegram_id)
+        if not card:
+            return None
+
+        cache_key = ("student-attendance", card.id, start_date, end_date, card.generation)
+        if (attendance := student_attendance_cache.get(cache_key)) is not None:
+            return attendance
+
+        missed = Visiting.status != AttendanceStatus.PRESENT
+        rows = (await db_session.execute(
+            select(Pair.discipline, func.count(), func.sum(case((missed, 1), else_=0)))
+            .select_from(Visiting)
+            .join(Pair, Visiting.pair_id == Pair.id)
+            .where(Visiting.student_id == card.id, Pair.date.between(start_date, end_date))
+            .group_by(Pair.discipline)
+            .order_by(Pair.discipline)
+        )).all()
+        missed_dates = (await db_session.execute(
+            select(Pair.date)
+            .select_from(Visiting)
+            .join(Pair, Visiting.pair_id == Pair.id)
+            .where(Visiting.student_id == card.id, Pair.date.between(start_date, end_date), missed)
+            .distinct()
+            .order_by(Pair.date)
+        )).scalars().all()
+
+        attendance = {
+            "full_name": card.full_name,
+            "group_name": card.group_name,
+            "disciplines": {discipline: {"total": total, "missed": missed or 0} for discipline, total, missed in rows},
+            "missed_dates": list(missed_dates),
+        }
+        student_attendance_cache.put(cache_key, attendance)
+        return attendance
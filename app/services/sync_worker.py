@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import socket
+from typing import AsyncIterator, List, Optional
+
+from app.core.settings import (
+    SYNC_JOB_LEASE_SECONDS,
+    SYNC_JOB_MAX_ATTEMPTS,
+    SYNC_WORKER_POLL_INTERVAL,
+)
+from app.db.crud.sync_jobs import (
+    claim_sync_job,
+    enqueue_sync_job,
+    finish_sync_job,
+    get_sync_job,
+    renew_sync_job_lease,
+)
+from app.db.crud.users import get_all_teachers, get_teacher, get_teacher_by_id
+from app.db.models.sync_jobs import SyncJob, SyncJobStatus
+from app.services.visiting import VisitingSyncPipeline
+from app.session.session_manager import check_website_access
+
+logger = logging.getLogger(__name__)
+
+
+async def enqueue_visiting_sync(
+    teacher_telegram_id: Optional[int] = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+) -> List[int]:
+    """Queue one sync job per teacher (or for a single teacher) and return the job ids."""
+    start_date = start_date or datetime.date(2025, 1, 1)
+    end_date = end_date or datetime.date.today()
+    if start_date > end_date:
+        raise ValueError("start_date must be less than or equal to end_date")
+
+    teachers = [await get_teacher(telegram_id=teacher_telegram_id)] if teacher_telegram_id else await get_all_teachers()
+    jobs = [
+        await enqueue_sync_job(teacher_id=teacher.id, start_date=start_date, end_date=end_date)
+        for teacher in teachers if teacher
+    ]
+    return [job.id for job in jobs]
+
+
+class SyncWorker:
+    """
+    Headless worker that claims sync jobs from the ``sync_jobs`` table and runs them.
+
+    Several workers, in separate processes or on separate machines, can share one
+    database: each job is leased to a single worker, and a job whose worker died is
+    picked up again once its lease expires. The lease is renewed every third of its
+    length while the job runs, so a long sync is not taken over by another worker.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        poll_interval: float = SYNC_WORKER_POLL_INTERVAL,
+        lease_seconds: int = SYNC_JOB_LEASE_SECONDS,
+        max_attempts: int = SYNC_JOB_MAX_ATTEMPTS,
+    ) -> None:
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    async def run(self) -> None:
+        """Claim and run jobs until cancelled."""
+        logger.info(f"Sync worker {self.worker_id} started.")
+        while True:
+            try:
+                job = await claim_sync_job(
+                    worker_id=self.worker_id, lease_seconds=self.lease_seconds, max_attempts=self.max_attempts)
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self.run_job(job)
+
+    async def run_job(self, job: SyncJob) -> None:
+        logger.info(f"Worker {self.worker_id} running {job}.")
+        try:
+            teacher = await get_teacher_by_id(teacher_id=job.teacher_id)
+            if not teacher:
+                raise ValueError(f"Teacher {job.teacher_id} not found.")
+            if not await check_website_access():
+                raise ConnectionError("Website is not accessible.")
+
+            pipeline = VisitingSyncPipeline(
+                job.start_date, job.end_date,
+                group_ids={job.group_id} if job.group_id else None,
+            )
+            async with self._keep_lease(job):
+                stats = await pipeline.run([teacher])
+        except Exception as e:
+            logger.error(f"Sync job {job.id} failed: {e}", exc_info=True)
+            await finish_sync_job(job_id=job.id, worker_id=self.worker_id, status=SyncJobStatus.FAILED, result=str(e))
+            return
+
+        await finish_sync_job(
+            job_id=job.id,
+            worker_id=self.worker_id,
+            status=SyncJobStatus.DONE if stats.complete else SyncJobStatus.FAILED,
+            result=stats.summary(),
+        )
+
+    @contextlib.asynccontextmanager
+    async def _keep_lease(self, job: SyncJob) -> AsyncIterator[None]:
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(self.lease_seconds / 3)
+                try:
+                    if not await renew_sync_job_lease(
+                            job_id=job.id, worker_id=self.worker_id, lease_seconds=self.lease_seconds):
+                        logger.warning(f"Worker {self.worker_id} lost the lease of sync job {job.id}.")
+                        return
+                except Exception as e:
+                    logger.error(f"Worker {self.worker_id} failed to renew the lease of sync job {job.id}: {e}")
+
+        renewer = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await renewer
+
+
+async def wait_for_sync_jobs(job_ids: List[int], timeout: float, poll_interval: float = SYNC_WORKER_POLL_INTERVAL) -> bool:
+    """Wait until the jobs are done or failed; returns False if the timeout ran out first."""
+    pending = set(job_ids)
+    try:
+        async with asyncio.timeout(timeout):
+            while pending:
+                for job_id in list(pending):
+                    job = await get_sync_job(job_id=job_id)
+                    if not job or job.status in (SyncJobStatus.DONE, SyncJobStatus.FAILED):
+                        pending.discard(job_id)
+                if pending:
+                    await asyncio.sleep(poll_interval)
+    except TimeoutError:
+        return False
+    return True
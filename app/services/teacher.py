@@ -1,110 +1,148 @@
-from collections import defaultdict
 from datetime import date
 import json
 import traceback
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple
 from async_lru import alru_cache
 import asyncio
 import logging
 
-from sqlalchemy import  distinct, select
+from sqlalchemy import  Row, distinct, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.crud.groups import create_group, get_group, get_or_create_group
-from app.db.db_session import with_session
-from app.db.models.absences import AttendanceStatus, Visiting
-from app.db.models.pairs import Pair
+from app.db.crud.attendance_logs import get_groups_sync_state
+from app.db.crud.group_generations import bump_group_generations
+from app.db.crud.groups import upsert_groups
+from app.db.db_session import get_session, with_session
+from app.db.models.absences import AttendanceStatus
+from app.db.models.daily_attendance import DailyAttendance
+from app.db.models.group_generations import GroupGeneration
 from app.parsers.urls import link_teacher_supervision, link_to_activity
 
-from app.db.crud.users import get_teacher, get_user_of_telegram_id
+from app.db.crud.users import get_roster_students, get_teacher, get_user_of_telegram_id, upsert_students
 from app.session.session_manager import SessionManager, create_session, require_website_access
 from app.parsers.group_parser import GroupParser
+from app.services.progress import ProgressChannel
+from app.services.report_cache import report_cache
 from app.parsers.student_parser import StudentParser
-from app.db.models.users import Student, Teacher, User, UserRole
+from app.db.models.users import Student, Teacher, User
 from app.db.models.groups import Group
 
 class TeacherDataUpdater:
-    def __init__(self,id_telegram: int) -> None: 
+    def __init__(self,id_telegram: int, progress: Optional[ProgressChannel] = None) -> None: 
         
         self.id_telegram: int = id_telegram
+        self.progress = progress
+        self._groups_fetched = 0
+        self._groups_total = 0
 
     
-    @with_session
-    async def _get_existing_students(self, db_session: AsyncSession) -> Dict[str, Student]:  # Type hint corrected
-        """Bulk fetch existing students."""
-        result = await db_session.execute(select(Student))
-        return {user.full_name: user for user in result.scalars()}
-
-    async def _update_group_students(
-        self,
-        sm: SessionManager,
-        group: Dict,
-        user: User,
-        existing_students: Dict[str, Student],
-    ) -> List[Student]:
-        """Process students for a single group."""
-        _group = await get_or_create_group(
-            id_curator=user.id, 
-            _id_group=group["id"], 
-            name=group["name"]
+    @staticmethod
+    async def _get_existing_students(
+        db_session: AsyncSession, fetched_groups: List[Tuple[Dict, List[Dict[str, Any]]]]
+    ) -> Tuple[Dict[int, Row], Dict[str, Row]]:
+        """Look up only the students on the fetched rosters, keyed by kodstud and, for rows without one, by name."""
+        roster = [student for _, students_data in fetched_groups for student in students_data]
+        rows = await get_roster_students(
+            db_session=db_session,
+            kodstuds=[student["kodstud"] for student in roster],
+            full_names=[student["full_name"] for student in roster],
         )
+        by_kodstud = {row.kodstud: row for row in rows if row.kodstud is not None}
+        by_name = {row.full_name: row for row in rows if row.kodstud is None}
+        return by_kodstud, by_name
 
+    async def _fetch_group_students(self, sm: SessionManager, group: Dict) -> Tuple[Dict, List[Dict[str, Any]]]:
+        """Fetch the student list of a single group. Network only, no database access."""
         async with await sm.get(link_to_activity.format(id_group=group["id"])) as response:
             students_data = await StudentParser.parse_students_list(await response.text())
+        self._groups_fetched += 1
+        if self.progress:
+            self.progress.publish(f"Загружено групп: {self._groups_fetched}/{self._groups_total}")
+        return group, students_data
 
-        processed_students = []
+    def _update_group_students(
+        self,
+        group_id: int,
+        students_data: List[Dict[str, Any]],
+        existing_students: Tuple[Dict[int, Row], Dict[str, Row]],
+        new_students: List[Dict[str, Any]],
+        changed_students: List[Dict[str, Any]],
+        seen_kodstuds: Set[int],
+    ) -> int:
+        """
+        Reconcile the roster of a single group with the database.
+
+        The roster is authoritative: a known student moves to this group and gets
+        the kodstud and name from the page. A student already listed on another
+        roster in this run is skipped. Rows to insert and update are collected for
+        one bulk write; returns the number of students processed, not counting the skipped ones.
+        """
+        by_kodstud, by_name = existing_students
+        processed = 0
         for student_data in students_data:
-            if existing_student := existing_students.get(
-                student_data["full_name"]
-            ):
-                if existing_student.group_id is not None:
-                    break
-                student = existing_student
-                student.group_id = _group.id
-            else:
-                student = Student(
-                        id_stud=student_data["id_stud"],
-                        kodstud=student_data["kodstud"],
-                        full_name=student_data["full_name"],
-                        role=UserRole.STUDENT,
-                        group_id=_group.id,
-                )
-                existing_students[student.full_name] = student
-            processed_students.append(student)
-
-        return processed_students, _group 
+            if student_data["kodstud"] in seen_kodstuds:
+                continue
+            seen_kodstuds.add(student_data["kodstud"])
+            processed += 1
+            values = {
+                "id_stud": student_data["id_stud"],
+                "kodstud": student_data["kodstud"],
+                "full_name": student_data["full_name"],
+                "group_id": group_id,
+            }
+            existing = by_kodstud.get(values["kodstud"]) or by_name.pop(values["full_name"], None)
+            if existing is None:
+                new_students.append(values)
+            elif any(getattr(existing, column) != value for column, value in values.items()):
+                changed_students.append({"id": existing.id, **values})
 
-    @with_session
-    async def update_teacher_data(self, db_session: AsyncSession) -> Dict[str, int]:
-        """Efficiently process and store teacher's group and student data."""
+        return processed
+
+    async def update_teacher_data(self) -> Dict[str, int]:
+        """
+        Efficiently process and store teacher's group and student data.
+
+        All pages are fetched before a database session is opened, so the write
+        phase is a single short transaction that never waits on osu.ru.
+        """
 
         user = await get_teacher(telegram_id=self.id_telegram)
         if not user:
             raise ValueError("User not found.")
 
-        existing_students = await self._get_existing_students(db_session=db_session)
-
         async with create_session(user) as sm:
-                async with await sm.get(link_teacher_supervision) as response:
-                    groups_data = await GroupParser.parse_groups(await response.text())
-
-                group_tasks = []
-                for group in groups_data:  
-                    task = self._update_group_students(sm, group, user, existing_students)
-                    group_tasks.append(task)
-                results = await asyncio.gather(*group_tasks)  
-                all_students = []
-                for students, group_obj in results: 
-                        all_students.extend(students)
-                        await db_session.merge(group_obj)
-                        
-                if not user.is_data_parsed:
-                    user.is_data_parsed = True
-                    await db_session.merge(user)
-                    
-                db_session.add_all(all_students)
-                await db_session.commit()
-
-                return {"groups_count": len(groups_data), "students_count": len(all_students)}
+            async with await sm.get(link_teacher_supervision) as response:
+                groups_data = await GroupParser.parse_groups(await response.text())
+
+            self._groups_total = len(groups_data)
+            fetched_groups = await asyncio.gather(
+                *(self._fetch_group_students(sm, group) for group in groups_data))
+
+        async with get_session() as db_session:
+            existing_students = await self._get_existing_students(db_session, fetched_groups)
+            previous_groups = {row.id: row.group_id for rows in existing_students for row in rows.values()}
+
+            group_ids = await upsert_groups(db_session=db_session, id_curator=user.id, groups=groups_data)
+
+            students_count = 0
+            new_students, changed_students, seen_kodstuds = [], [], set()
+            for group, students_data in fetched_groups:
+                students_count += self._update_group_students(
+                    group_ids[group["id"]], students_data, existing_students,
+                    new_students, changed_students, seen_kodstuds)
+
+            await upsert_students(
+                db_session=db_session, new_students=new_students, changed_students=changed_students)
+            await bump_group_generations(
+                db_session=db_session,
+                group_ids={student["group_id"] for student in new_students + changed_students}
+                | {previous_groups[student["id"]] for student in changed_students if previous_groups[student["id"]]},
+            )
+
+            if not user.is_data_parsed:
+                await db_session.execute(
+                    update(Teacher).where(Teacher.id == user.id).values(is_data_parsed=True))
+
+        return {"groups_count": len(groups_data), "students_count": students_count}
 
 
 
@@ -112,7 +150,7 @@ class TeacherDataUpdater:
 class TeacherDataService:
             
     @classmethod
-    async def parse_and_update_teacher_data(cls,telegram_id:int) -> None:
+    async def parse_and_update_teacher_data(cls,telegram_id:int, progress: Optional[ProgressChannel] = None) -> Dict[str, int]:
         """
         Orchestrate the parsing of teacher-related data with progress tracking.
 
@@ -121,7 +159,7 @@ class TeacherDataService:
         """
 
         try:
-            await first_parser_data(telegram_id=telegram_id)
+            return await first_parser_data(telegram_id=telegram_id, progress=progress)
         except Exception as e:
             logging.error(f"Data parsing error: {e}")
             raise e
@@ -150,42 +188,86 @@ class TeacherDataService:
         start_date: date,
         end_date: date,
         db_session: AsyncSession,
-    ) -> Dict[str, Dict[str, List[str]]]:
-        """Fetch student absences within a date range, grouped by group and student."""
+        by_date: bool = False,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Absence counts of a teacher's students within a date range, grouped by group name.
+
+        One query over the pre-aggregated ``DailyAttendance`` rows covers all of the
+        teacher's groups and returns a count per student, or per student and date
+        with `by_date`. Every group is present, with its sync state, even without absences::
 
-        teacher: Optional[Teacher] = await get_teacher(telegram_id=teacher_id)
-        if not teacher:
+            {group_name: {"group_id", "generation", "last_parsed_at", "log_start_date", "log_end_date",
+                          "data": {student_id: {"name", "total", "dates": {date: count}}}}}
+
+        The counts are cached under the groups' generations and shared between
+        callers, so they must not be modified; the sync state is always read fresh.
+        """
+        groups = (await db_session.execute(
+            select(Group.id, Group.name, func.coalesce(GroupGeneration.generation, 0).label("generation"))
+            .join(Teacher, Group.id_curator == Teacher.id)
+            .outerjoin(GroupGeneration, GroupGeneration.group_id == Group.id)
+            .where(Teacher.telegram_id == teacher_id)
+            .order_by(Group.name)
+        )).all()
+        if not groups:
             return {}
 
-        absences: Dict[str, Dict[str, List[str]]] = {}
-        for group in teacher.curated_groups:
-            absences[group.name] = {'group': group, 'data': defaultdict(lambda: {'dates': [], 'name': ''})}
-
-            query = (
-                select(Pair.date, Student.id, Student.full_name)
-                .select_from(Visiting)
-                .join(Pair)
-                .join(Student)
-                .filter(
-                    Student.group_id == group.id,
-                    Pair.date.between(start_date, end_date),
-                    Visiting.status != AttendanceStatus.PRESENT,
-                )
-            )
+        generations = tuple((group.id, group.generation) for group in groups)
+        cache_key = ("absences", teacher_id, start_date, end_date, by_date, generations)
+        if (counts := report_cache.get(cache_key)) is None:
+            counts = await TeacherDataService._fetch_absence_counts(
+                db_session, [group.id for group in groups], start_date, end_date, by_date)
+            report_cache.put(cache_key, counts)
 
-            result = await db_session.execute(query)
-            for pair_date, student_id, student_name in result:
-                absences[group.name]['data'][student_id]['dates'].append(pair_date)
-                absences[group.name]['data'][student_id]['name'] = student_name
+        sync_state = await get_groups_sync_state(db_session=db_session, group_ids=[group.id for group in groups])
+        absences: Dict[str, Dict[str, Any]] = {}
+        for group in groups:
+            parsed_at, log_start_date, log_end_date = sync_state.get(group.id, (None, None, None))
+            absences[group.name] = {
+                "group_id": group.id,
+                "generation": group.generation,
+                "last_parsed_at": parsed_at,
+                "log_start_date": log_start_date,
+                "log_end_date": log_end_date,
+                "data": counts[group.id],
+            }
         return absences
 
+    @staticmethod
+    async def _fetch_absence_counts(
+        db_session: AsyncSession, group_ids: List[int], start_date: date, end_date: date, by_date: bool
+    ) -> Dict[int, Dict[int, Dict[str, Any]]]:
+        counts: Dict[int, Dict[int, Dict[str, Any]]] = {group_id: {} for group_id in group_ids}
+        columns = [Student.group_id, Student.id, Student.full_name] + ([DailyAttendance.date] if by_date else [])
+        query = (
+            select(*columns, func.sum(DailyAttendance.count))
+            .select_from(DailyAttendance)
+            .join(Student, DailyAttendance.student_id == Student.id)
+            .where(
+                Student.group_id.in_(group_ids),
+                DailyAttendance.date.between(start_date, end_date),
+                DailyAttendance.status != AttendanceStatus.PRESENT,
+            )
+            .group_by(*columns)
+            .having(func.sum(DailyAttendance.count) > 0)
+            .order_by(Student.full_name)
+        )
+
+        for row in await db_session.execute(query):
+            student = counts[row.group_id].setdefault(row.id, {"name": row.full_name, "total": 0, "dates": {}})
+            student["total"] += row[-1]
+            if by_date:
+                student["dates"][row.date] = row[-1]
+        return counts
+
 @require_website_access
-async def first_parser_data(telegram_id: int)  -> Any | None:
+async def first_parser_data(telegram_id: int, progress: Optional[ProgressChannel] = None)  -> Any | None:
     
     """
     Wrapper function for teacher data processing with improved performance.
     """
-    processor =  TeacherDataUpdater(id_telegram=telegram_id)
+    processor =  TeacherDataUpdater(id_telegram=telegram_id, progress=progress)
     return await processor.update_teacher_data()
 
     
@@ -1,30 +1,49 @@
 import asyncio
+import contextlib
 import datetime
 import logging
+import math
 import time
 import traceback
+import weakref
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache, wraps
-from typing import Any, Dict, Generator, List, Optional, Tuple
+from itertools import compress, repeat
+from typing import Any, Dict, Generator, List, NamedTuple, Optional, Set, Tuple
 
 import pandas as pd
-from sqlalchemy import Select, and_, desc, insert, select, update
+from sqlalchemy import Row, Select, and_, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from async_lru import alru_cache
-from sqlalchemy.orm import joinedload
-from app.db.crud.pairs import get_or_create_pair
+from app.db.crud.attendance_logs import get_last_attendance_log, record_attendance_log, rewind_attendance_log
+from app.db.crud.daily_attendance import apply_daily_attendance_deltas
+from app.db.crud.group_generations import bump_group_generations
+from app.db.crud.pairs import get_or_create_pairs, link_pairs_to_groups
 from app.db.crud.users import get_all_teachers, get_teacher
 from app.db.db_session import with_session
-from app.db.models.absences import AttendanceStatus, Visiting, status_enum
-from app.db.models.group_attendance_log import GroupAttendanceLog
-from app.db.models.group_pair import group_pair_association
+from app.db.queries import dialect_insert
+from app.db.models.absences import AttendanceStatus, Visiting, VisitingStatusChange, status_enum
 from app.db.models.groups import Group
-from app.db.models.pairs import Pair
 from app.db.models.users import Teacher
-from app.core.settings import tz
+from app.core.settings import (
+    SYNC_BATCH_QUEUE_SIZE,
+    SYNC_BATCH_SIZE,
+    SYNC_PAGE_QUEUE_SIZE,
+    SYNC_PARSE_WORKERS,
+    SYNC_REQUEST_TIMEOUT,
+    SYNC_SCHEDULE_LOOKBACK_DAYS,
+    SYNC_MAX_CONCURRENT_REQUESTS,
+    SYNC_TEACHER_TIMEOUT,
+    SYNC_WINDOW_DEFAULT_DAYS,
+    SYNC_WINDOW_MIN_DAYS,
+    SYNC_WINDOW_TARGET_BYTES,
+    SYNC_WINDOW_TARGET_SECONDS,
+    tz,
+)
 from app.parsers.attendance_parser import AttendanceParser
 from app.parsers.urls import link_to_activity_is_time
+from app.services.progress import ProgressChannel
 from app.session.session_manager import SessionManager, create_session, require_website_access
 from app.tools.support import timeit
 
@@ -32,18 +51,35 @@ logger = logging.getLogger(__name__)
 
 
 def control_parsing_group(func):
+    """
+    Clamp the requested window against the group's attendance log and record the sync.
+
+    When the fetched range overlaps or touches the logged one, the log grows to
+    their union, so its start also moves back for an earlier range. A range after
+    a gap restarts the log, and a range wholly before it leaves the log alone.
+    Only a range that reaches the end of the log counts as a fresh sync. Such a
+    range is still fetched from ``SYNC_SCHEDULE_LOOKBACK_DAYS`` before its end, so
+    status corrections made on osu.ru to recent days are picked up.
+
+    The log is read before and written after the wrapped call in short sessions of
+    their own, so no database connection is held while it waits on osu.ru.
+    """
 
     @wraps(func)
-    @with_session
-    async def wrapper(*args, db_session: AsyncSession, **kwargs):
+    async def wrapper(*args, **kwargs):
         group_id = kwargs['group'].id
         start_date = kwargs['start_date']
         end_date = kwargs['end_date']
         current_time = datetime.datetime.now(tz)
 
-        log_entry_query = select(GroupAttendanceLog).filter_by(
-            group_id=group_id).order_by(desc(GroupAttendanceLog.last_parsed_at))
-        log_entry = (await db_session.execute(log_entry_query)).scalar_one_or_none()
+        log_entry = await get_last_attendance_log(group_id=group_id)
+        log_start_date = log_end_date = None
+
+        if end_date > current_time.date():
+            kwargs['end_date'] = current_time.date()
+            end_date_for_log = current_time.date()
+        else:
+            end_date_for_log = end_date
 
         if log_entry:
             log_start_date = log_entry.start_date.date(
@@ -51,120 +87,503 @@ def control_parsing_group(func):
             log_end_date = log_entry.end_date.date(
             ) if log_entry.end_date else None
 
-            if log_end_date and log_end_date > start_date and log_start_date < start_date:
-                kwargs['start_date'] = log_end_date
+            if log_end_date and log_start_date and log_end_date > start_date and log_start_date < start_date:
+                clamped = log_end_date
+                if end_date_for_log >= log_end_date:
+                    # osu.ru corrects recent days after the fact, so they are fetched again
+                    recheck_start = end_date_for_log - datetime.timedelta(days=SYNC_SCHEDULE_LOOKBACK_DAYS)
+                    clamped = max(start_date, min(log_end_date, recheck_start))
+                kwargs['start_date'] = clamped
                 logger.info(f"Adjusted start_date for group {group_id} to {kwargs['start_date']}.")
 
-        if end_date > current_time.date():
-            kwargs['end_date'] = current_time.date()
-            end_date_for_log = current_time.date()
-        else:
-            end_date_for_log = end_date
-
-        log_entry_data = {"last_parsed_at": current_time, "end_date": end_date_for_log}
-        if log_entry:
-            update_query = update(GroupAttendanceLog).where(
-                GroupAttendanceLog.id == log_entry.id).values(log_entry_data)
-            await db_session.execute(update_query)
-        else:
-            log_entry_data['start_date'] = start_date
-            db_session.add(GroupAttendanceLog(
-                group_id=group_id, **log_entry_data))
+        if kwargs['start_date'] > kwargs['end_date']:
+            logger.info(f"Window {start_date}..{end_date} of group {group_id} is already covered by its log.")
+            return None
 
         try:
             result = await func(*args, **kwargs)
-            await db_session.commit()
-            return result
         except Exception as e:
             logger.error(f"Error during parsing: {e}", exc_info=True)
-            await db_session.rollback()
             raise
 
+        if result is None:
+            return result
+        day = datetime.timedelta(days=1)
+        if not (log_start_date and log_end_date) or start_date > log_end_date + day:
+            await record_attendance_log(
+                group_id=group_id,
+                last_parsed_at=current_time,
+                start_date=start_date,
+                end_date=end_date_for_log,
+                log_id=log_entry.id if log_entry else None,
+            )
+        elif end_date_for_log >= log_start_date - day:
+            # A window that ends inside the logged range (e.g. a backfill) must not rewind the log
+            fresh = end_date_for_log >= log_end_date
+            new_start = min(start_date, log_start_date)
+            if fresh or new_start < log_start_date:
+                await record_attendance_log(
+                    group_id=group_id,
+                    last_parsed_at=current_time if fresh else log_entry.last_parsed_at,
+                    start_date=new_start,
+                    end_date=max(end_date_for_log, log_end_date),
+                    log_id=log_entry.id,
+                )
+        return result
+
     return wrapper
 
 
-@dataclass
-class AttendanceRecord:
+class AttendanceRecord(NamedTuple):
     teacher_id: int
     group_id: int
     student_id: int
     status: str
     key_pair:int
-    date: datetime.datetime
+    date: datetime.date
     detail: str
     discipline: str
     pair_number: str
 
 
+@dataclass
+class FetchedPage:
+    teacher: Teacher
+    group: Group
+    start_date: datetime.date
+    html: str
+
+
+@dataclass
+class TeacherSyncStatus:
+    name: str
+    groups_total: int
+    groups_done: int = 0
+    state: str = "pending"
+    error: Optional[str] = None
+    failed_pages: int = 0
+    failed_records: int = 0
+
+
+@dataclass
+class SyncStats:
+    pages: int = 0
+    records: int = 0
+    batches: int = 0
+    saved: int = 0
+    updated: int = 0
+    failed_pages: int = 0
+    failed_records: int = 0
+    unsaved_since: Dict[int, datetime.date] = field(default_factory=dict)
+    teachers: Dict[int, TeacherSyncStatus] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def complete(self) -> bool:
+        """Every teacher was fetched and every page was parsed and saved."""
+        return not self.unsaved_since and all(status.state == "ok" for status in self.teachers.values())
+
+    def mark_unsaved(self, group_id: int, since: datetime.date) -> None:
+        """Remember the earliest date of a group whose records did not reach the database."""
+        self.unsaved_since[group_id] = min(since, self.unsaved_since.get(group_id, since))
+
+    def progress_text(self) -> str:
+        """One-line progress with a rough ETA extrapolated from the groups done so far."""
+        done = sum(status.groups_done for status in self.teachers.values())
+        total = sum(status.groups_total for status in self.teachers.values())
+        text = f"Групп загружено: {done}/{total}, новых записей: {self.saved}, изменённых: {self.updated}"
+        if 0 < done < total:
+            remaining = (time.monotonic() - self.started_at) / done * (total - done)
+            text += f", осталось ~{int(remaining)} с" if remaining < 60 else f", осталось ~{int(remaining // 60) + 1} мин"
+        return text
+
+    def summary(self) -> str:
+        """Human-readable per-teacher outcome of the sync."""
+        lines = [
+            f"{status.name}: {status.state}, групп {status.groups_done}/{status.groups_total}"
+            + (f" ({status.error})" if status.error else "")
+            + (f", не разобрано страниц: {status.failed_pages}" if status.failed_pages else "")
+            + (f", не сохранено записей: {status.failed_records}" if status.failed_records else "")
+            for status in self.teachers.values()
+        ]
+        lines.append(f"Новых записей: {self.saved}, изменённых: {self.updated}.")
+        if self.failed_pages or self.failed_records:
+            lines.append(
+                f"Не разобрано страниц: {self.failed_pages}, не сохранено записей: {self.failed_records}; "
+                "эти данные будут загружены заново при следующем обновлении.")
+        return "\n".join(lines)
+
+
 class AttendanceParserService:
 
     @classmethod
-    @control_parsing_group
     @timeit
-    async def parse_group_attendance(
+    async def fetch_group_attendance(
         cls, sm: SessionManager, group: Group, teacher: Teacher, start_date: datetime.datetime, end_date: datetime.datetime
-    ) -> List[AttendanceRecord]:
-        """Parse attendance for a group within a date range."""
+    ) -> Optional[str]:
+        """Fetch the raw attendance page of a group within a date range."""
         url = link_to_activity_is_time.format(
             id_group=group._id_group,
             stdt=start_date.strftime("%d.%m.%Y"),
             endt=end_date.strftime("%d.%m.%Y"),
         )
-        try:
-            async with await sm.get(url) as response:
-                attendance_data = AttendanceParser.parse_attendance(await response.text())
-            if attendance_data.empty:
-                return []
+        async with await sm.get(url) as response:
+            response.raise_for_status()
+            return await response.text()
 
-            return cls._build_attendance_records(group, teacher, attendance_data)
-        except Exception as e:
-            logger.error(f"Error parsing group {group._id_group}: {e}",exc_info=True)
+    @classmethod
+    def parse_group_page(cls, group: Group, teacher: Teacher, html: str) -> List[AttendanceRecord]:
+        """Parse a fetched attendance page into records. Runs off the event loop; parse errors propagate."""
+        attendance_data = AttendanceParser.parse_attendance(html)
+        if attendance_data.empty:
             return []
 
+        return cls._build_attendance_records(group, teacher, attendance_data)
+
     @staticmethod
     def _build_attendance_records(group: Group, teacher: Teacher, attendance_data: pd.DataFrame) -> List[AttendanceRecord]:
-        """Build AttendanceRecord objects from parsed data."""
-        records = []
-        attendance_data_grouped = attendance_data.groupby("kodstud")
-        for student in group.students:
-            if student.kodstud in attendance_data_grouped.groups:
-                student_data = attendance_data_grouped.get_group(
-                    student.kodstud)
-                records.extend(
-                    AttendanceRecord(
-                        teacher_id=teacher.id,
-                        group_id=group.id,
-                        student_id=student.id,
-                        key_pair=row["key_pair"],
-                        status=row["status"],
-                        date=row["date"],
-                        detail=row["details"],
-                        discipline=row["discipline"],
-                        pair_number=row["pair_number"],
-                    )
-                    for _, row in student_data.iterrows()
-                )
-        return records
+        """Build AttendanceRecord tuples from parsed data with a single kodstud -> student_id hash join."""
+        student_ids = {student.kodstud: student.id for student in group.students if student.kodstud is not None}
+        matched = [student_ids.get(kodstud) for kodstud in attendance_data["kodstud"].tolist()]
+        keep = [student_id is not None for student_id in matched]
+        count = sum(keep)
+        columns = (
+            compress(attendance_data[column].tolist(), keep)
+            for column in ("status", "key_pair", "date", "details", "discipline", "pair_number")
+        )
+        return list(map(AttendanceRecord._make, zip(
+            repeat(teacher.id, count), repeat(group.id, count), compress(matched, keep), *columns)))
+
+def _leaf_exceptions(error: BaseException) -> List[BaseException]:
+    """The exceptions inside (possibly nested) exception groups, or the exception itself."""
+    if isinstance(error, BaseExceptionGroup):
+        return [leaf for inner in error.exceptions for leaf in _leaf_exceptions(inner)]
+    return [error]
+
+
+_request_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
-    @classmethod
-    async def parse_teacher_attendance(
-        cls, teacher: Teacher, start_date: datetime.date, end_date: datetime.date
-    ) -> List[AttendanceRecord]:
-        """Parse attendance for all groups of a teacher."""
-        async with create_session(teacher) as sm:
-            tasks = [
-                cls.parse_group_attendance(
-                    sm=sm, group=group, teacher=teacher, start_date=start_date, end_date=end_date)
-                for group in teacher.curated_groups
-            ]
-            results = await asyncio.gather(*tasks)
 
-        return [record for group_result in results for record in group_result]
+def request_slots() -> asyncio.Semaphore:
+    """Process-wide limit on concurrent osu.ru attendance requests (one semaphore per event loop)."""
+    loop = asyncio.get_running_loop()
+    if loop not in _request_slots:
+        _request_slots[loop] = asyncio.Semaphore(SYNC_MAX_CONCURRENT_REQUESTS)
+    return _request_slots[loop]
+
+
+class RequestClock:
+    """
+    Wall-clock time during which at least one request of a teacher was in flight.
+
+    Time spent waiting for a request slot or for room in the page queue is not
+    counted, so a teacher queued behind others keeps their whole budget.
+    """
+
+    def __init__(self) -> None:
+        self._active = 0
+        self._since = 0.0
+        self._elapsed = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed + (time.monotonic() - self._since if self._active else 0.0)
+
+    @contextlib.contextmanager
+    def running(self) -> Generator[None, None, None]:
+        if not self._active:
+            self._since = time.monotonic()
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if not self._active:
+                self._elapsed += time.monotonic() - self._since
+
+
+class FetchWindowPlanner:
+    """
+    Sizes the date windows of a group's attendance request from earlier fetches.
+
+    Every fetched page updates a moving average of bytes and seconds per day of
+    range for its group. The next range is split into windows small enough to stay
+    under both the byte and the latency target. Groups that were never fetched
+    start at ``SYNC_WINDOW_DEFAULT_DAYS``.
+    """
+
+    def __init__(
+        self,
+        target_bytes: int = SYNC_WINDOW_TARGET_BYTES,
+        target_seconds: float = SYNC_WINDOW_TARGET_SECONDS,
+        default_days: int = SYNC_WINDOW_DEFAULT_DAYS,
+        min_days: int = SYNC_WINDOW_MIN_DAYS,
+        smoothing: float = 0.3,
+    ) -> None:
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.default_days = default_days
+        self.min_days = min_days
+        self.smoothing = smoothing
+        self._per_day: Dict[int, Tuple[float, float]] = {}
+
+    def observe(self, group_id: int, days: int, size: int, seconds: float) -> None:
+        bytes_per_day, seconds_per_day = size / days, seconds / days
+        if group_id in self._per_day:
+            old_bytes, old_seconds = self._per_day[group_id]
+            bytes_per_day = old_bytes + self.smoothing * (bytes_per_day - old_bytes)
+            seconds_per_day = old_seconds + self.smoothing * (seconds_per_day - old_seconds)
+        self._per_day[group_id] = (bytes_per_day, seconds_per_day)
+
+    def window_days(self, group_id: int) -> float:
+        if group_id not in self._per_day:
+            return self.default_days
+        bytes_per_day, seconds_per_day = self._per_day[group_id]
+        days = min(
+            self.target_bytes / bytes_per_day if bytes_per_day else math.inf,
+            self.target_seconds / seconds_per_day if seconds_per_day else math.inf,
+        )
+        return max(self.min_days, days)
+
+    def plan(
+        self, group_id: int, start_date: datetime.date, end_date: datetime.date
+    ) -> List[Tuple[datetime.date, datetime.date]]:
+        """Split `[start_date, end_date]` into equal windows no longer than the group's window size."""
+        total_days = (end_date - start_date).days + 1
+        count = max(1, math.ceil(total_days / self.window_days(group_id)))
+        bounds = [start_date + datetime.timedelta(days=total_days * index // count) for index in range(count + 1)]
+        return [(bounds[index], bounds[index + 1] - datetime.timedelta(days=1)) for index in range(count)]
+
+
+fetch_window_planner = FetchWindowPlanner()
+
+
+class VisitingSyncPipeline:
+    """
+    Fetch → parse → persist pipeline for visiting sync.
+
+    The stages are connected by bounded queues: fetchers wait while the page
+    queue is full and parsers wait while the batch queue is full, so memory is
+    bounded by the queue sizes rather than by the size of the whole sync.
+    Every batch is committed on its own, so the first records reach the
+    database while slower teachers are still being fetched.
+
+    A group's range is fetched as several date windows sized by
+    ``fetch_window_planner``, concurrently under the process-wide request limit.
+    The attendance log is read and written once per group.
+
+    Pages that fail to parse and batches that fail to save are counted in the
+    stats, and the logs of their groups are rewound to the day before the first
+    lost record once all stages are done, so the next sync fetches them again.
+    """
+
+    def __init__(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        parse_workers: int = SYNC_PARSE_WORKERS,
+        batch_size: int = SYNC_BATCH_SIZE,
+        teacher_timeout: float = SYNC_TEACHER_TIMEOUT,
+        request_timeout: float = SYNC_REQUEST_TIMEOUT,
+        group_ids: Optional[Set[int]] = None,
+        fetch_concurrency: Optional[int] = None,
+        progress: Optional[ProgressChannel] = None,
+    ) -> None:
+        self.start_date = start_date
+        self.end_date = end_date
+        self.parse_workers = parse_workers
+        self.batch_size = batch_size
+        self.teacher_timeout = teacher_timeout
+        self.request_timeout = request_timeout
+        self.group_ids = group_ids
+        self._fetch_slots = asyncio.Semaphore(fetch_concurrency) if fetch_concurrency else contextlib.nullcontext()
+        self.progress = progress
+        self.stats = SyncStats()
+        self._request_clocks: Dict[int, RequestClock] = {}
+        self._pages: asyncio.Queue[Optional[FetchedPage]] = asyncio.Queue(maxsize=SYNC_PAGE_QUEUE_SIZE)
+        self._batches: asyncio.Queue[Optional[List[AttendanceRecord]]] = asyncio.Queue(maxsize=SYNC_BATCH_QUEUE_SIZE)
+
+    async def run(self, teachers: List[Teacher]) -> SyncStats:
+        """Run all stages for the given teachers and return the sync statistics."""
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._fetch_stage(teachers))
+            parsers = [tg.create_task(self._parse_stage()) for _ in range(self.parse_workers)]
+            tg.create_task(self._persist_stage())
+            await asyncio.wait(parsers)
+            await self._batches.put(None)
+        for group_id, since in self.stats.unsaved_since.items():
+            await rewind_attendance_log(group_id=group_id, end_date=since - datetime.timedelta(days=1))
+        return self.stats
+
+    def _report(self) -> None:
+        if self.progress:
+            self.progress.publish(self.stats.progress_text())
+
+    def plan_group_fetches(self, teachers: List[Teacher]) -> List[Tuple[Teacher, List[Group]]]:
+        """
+        Assign every osu.ru group to exactly one teacher session.
+
+        Groups are keyed by ``_id_group``, so a group reachable through several
+        teachers (or a teacher listed twice) is fetched once. Groups with the fewest
+        candidate teachers are placed first, each on the candidate with the fewest
+        groups so far, which spreads the requests over the available sessions.
+        """
+        unique_teachers = list({teacher.id: teacher for teacher in teachers}.values())
+        candidates: Dict[int, Tuple[Group, List[Teacher]]] = {}
+        for teacher in unique_teachers:
+            for group in teacher.curated_groups:
+                if self.group_ids is None or group.id in self.group_ids:
+                    candidates.setdefault(group._id_group, (group, []))[1].append(teacher)
+
+        assigned: Dict[int, List[Group]] = {teacher.id: [] for teacher in unique_teachers}
+        for group, group_teachers in sorted(candidates.values(), key=lambda candidate: len(candidate[1])):
+            teacher = min(group_teachers, key=lambda candidate: len(assigned[candidate.id]))
+            assigned[teacher.id].append(group)
+
+        shared = sum(len(group_teachers) - 1 for _, group_teachers in candidates.values())
+        if shared:
+            logger.info(f"Visiting sync plan: {len(candidates)} groups, {shared} duplicate group fetches skipped.")
+        return [(teacher, assigned[teacher.id]) for teacher in unique_teachers]
+
+    async def _fetch_stage(self, teachers: List[Teacher]) -> None:
+        async with asyncio.TaskGroup() as tg:
+            for teacher, groups in self.plan_group_fetches(teachers):
+                tg.create_task(self._fetch_teacher(teacher, groups))
+        for _ in range(self.parse_workers):
+            await self._pages.put(None)
+
+    async def _fetch_teacher(self, teacher: Teacher, groups: List[Group]) -> None:
+        """
+        Fetch the groups planned for a teacher over one authenticated session.
+
+        The groups run in a task group: the first failing or timed-out request
+        cancels its siblings, while pages already queued are still parsed and saved.
+        The login and the teacher's requests share the ``teacher_timeout`` budget,
+        measured by a ``RequestClock`` so that waits for a request slot or for the
+        page queue do not count. The outcome lands in ``stats.teachers``.
+        A teacher with no groups planned does not log in at all.
+        """
+        status = TeacherSyncStatus(name=teacher.full_name, groups_total=len(groups))
+        self.stats.teachers[teacher.id] = status
+        if not groups:
+            status.state = "ok"
+            return
+        clock = self._request_clocks[teacher.id] = RequestClock()
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                with clock.running():
+                    async with asyncio.timeout(self.teacher_timeout):
+                        sm = await stack.enter_async_context(create_session(teacher))
+                if not sm.status:
+                    raise PermissionError("login failed")
+                async with asyncio.TaskGroup() as tg:
+                    for group in groups:
+                        tg.create_task(self._fetch_group(sm, teacher, group, status))
+            status.state = "ok"
+        except Exception as e:
+            errors = _leaf_exceptions(e)
+            if clock.elapsed >= self.teacher_timeout and all(isinstance(error, TimeoutError) for error in errors):
+                status.state = "timeout"
+                logger.warning(
+                    f"Visiting sync for teacher {teacher.id} ran out of its {self.teacher_timeout}s request budget.")
+                self._report()
+                return
+            status.state = "error"
+            status.error = "; ".join(
+                f"{type(error).__name__}: {error}" if str(error) else type(error).__name__ for error in errors)
+            logger.error(f"Visiting sync for teacher {teacher.id} failed: {status.error}")
+        self._report()
+
+    async def _fetch_group(self, sm: SessionManager, teacher: Teacher, group: Group, status: TeacherSyncStatus) -> None:
+        await self._fetch_group_windows(
+            sm=sm, teacher=teacher, group=group, start_date=self.start_date, end_date=self.end_date)
+        status.groups_done += 1
+        self._report()
+
+    @control_parsing_group
+    async def _fetch_group_windows(
+        self, *, sm: SessionManager, teacher: Teacher, group: Group, start_date: datetime.date, end_date: datetime.date
+    ) -> int:
+        windows = fetch_window_planner.plan(group.id, start_date, end_date)
+        async with asyncio.TaskGroup() as tg:
+            for window_start, window_end in windows:
+                tg.create_task(self._fetch_window(sm, teacher, group, window_start, window_end))
+        return len(windows)
+
+    async def _fetch_window(
+        self, sm: SessionManager, teacher: Teacher, group: Group, start_date: datetime.date, end_date: datetime.date
+    ) -> None:
+        clock = self._request_clocks[teacher.id]
+        async with self._fetch_slots, request_slots():
+            remaining = self.teacher_timeout - clock.elapsed
+            if remaining <= 0:
+                raise TimeoutError
+            with clock.running():
+                async with asyncio.timeout(min(self.request_timeout, remaining)):
+                    started = time.perf_counter()
+                    html = await AttendanceParserService.fetch_group_attendance(
+                        sm=sm, group=group, teacher=teacher, start_date=start_date, end_date=end_date)
+                    elapsed = time.perf_counter() - started
+        fetch_window_planner.observe(group.id, (end_date - start_date).days + 1, len(html or ""), elapsed)
+        if html:
+            await self._pages.put(FetchedPage(teacher=teacher, group=group, start_date=start_date, html=html))
+
+    async def _parse_stage(self) -> None:
+        while (page := await self._pages.get()) is not None:
+            self.stats.pages += 1
+            try:
+                records = await asyncio.to_thread(
+                    AttendanceParserService.parse_group_page, page.group, page.teacher, page.html)
+            except Exception as e:
+                logger.error(f"Error parsing group {page.group._id_group}: {e}", exc_info=True)
+                self.stats.failed_pages += 1
+                self.stats.teachers[page.teacher.id].failed_pages += 1
+                self.stats.mark_unsaved(page.group.id, page.start_date)
+                self._report()
+                continue
+            if records:
+                self.stats.records += len(records)
+                await self._batches.put(records)
+
+    async def _persist_stage(self) -> None:
+        """Commit record batches, coalescing whatever is already queued up to ``batch_size``."""
+        finished = False
+        while not finished:
+            batch = await self._batches.get()
+            if batch is None:
+                break
+            while len(batch) < self.batch_size and not self._batches.empty():
+                extra = self._batches.get_nowait()
+                if extra is None:
+                    finished = True
+                    break
+                batch.extend(extra)
+            await self._save_batch(batch)
+
+    async def _save_batch(self, batch: List[AttendanceRecord]) -> None:
+        try:
+            result = await save_attendance_records(attendance_df=pd.DataFrame(batch))
+        except Exception as e:
+            logger.error(f"Error saving batch of {len(batch)} attendance records: {e}", exc_info=True)
+            self.stats.failed_records += len(batch)
+            for record in batch:
+                self.stats.teachers[record.teacher_id].failed_records += 1
+                self.stats.mark_unsaved(record.group_id, record.date)
+            self._report()
+            return
+        self.stats.batches += 1
+        self.stats.saved += result.inserted
+        self.stats.updated += result.updated
+        self._report()
 
 
 @require_website_access
 async def parse_visiting_of_pair(
-    teacher_telegram_id: Optional[int] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None ) -> None:
+    teacher_telegram_id: Optional[int] = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    progress: Optional[ProgressChannel] = None,
+) -> Optional[SyncStats]:
     """Parse visiting records for a specific teacher or all teachers."""
     start_date = start_date or datetime.date(2025, 1, 1)
     end_date = end_date or datetime.date.today()
@@ -173,90 +592,141 @@ async def parse_visiting_of_pair(
         raise ValueError("start_date must be less than or equal to end_date")
 
     teachers = [await get_teacher(telegram_id=teacher_telegram_id)] if teacher_telegram_id else await get_all_teachers()
+    teachers = [teacher for teacher in teachers if teacher]
 
     if not teachers:
         logger.warning("No teachers found for parsing.")
-        return
-
-    tasks = [AttendanceParserService.parse_teacher_attendance(
-        teacher, start_date, end_date) for teacher in teachers]
-    results = await asyncio.gather(*tasks)
-    if all_records := [record for result in results for record in result]:
-        logger.info(f"Saving {len(all_records)} attendance records.")
-        await save_attendance_records(attendance_df=pd.DataFrame(all_records),start_date=start_date, end_date=end_date)
-    else:
-        logger.info("No attendance records found.")
+        return None
+
+    stats = await VisitingSyncPipeline(start_date, end_date, progress=progress).run(teachers)
+    logger.info(
+        f"Visiting sync finished: {stats.pages} pages, {stats.records} records parsed, "
+        f"{stats.saved} new and {stats.updated} changed records saved in {stats.batches} batches.")
+    for teacher_id, status in stats.teachers.items():
+        logger.info(
+            f"Teacher {teacher_id}: {status.state}, {status.groups_done}/{status.groups_total} groups"
+            + (f", {status.error}" if status.error else "")
+            + (f", {status.failed_pages} pages not parsed" if status.failed_pages else "")
+            + (f", {status.failed_records} records not saved" if status.failed_records else ""))
+    return stats
+
+
+@dataclass
+class SaveResult:
+    inserted: int = 0
+    updated: int = 0
+    student_ids: Set[int] = field(default_factory=set)
+
+
+def _collect_status_changes(
+    existing_visits: Dict[Tuple[int, int], Row], records_df: pd.DataFrame, changed_at: datetime.datetime
+) -> List[Dict[str, Any]]:
+    """Compare observed statuses with stored visits and return the ones that changed."""
+    changes = []
+    for student_id, pair_id, status, detail in zip(
+        records_df["student_id"], records_df["pair_id"], records_df["status"], records_df["detail"]
+    ):
+        visit = existing_visits[(student_id, pair_id)]
+        new_status = status_enum(status)
+        if visit.status != new_status:
+            changes.append({
+                "visiting_id": visit.id,
+                "student_id": int(student_id),
+                "pair_id": int(pair_id),
+                "old_status": visit.status,
+                "new_status": new_status,
+                "message": detail,
+                "changed_at": changed_at,
+            })
+    return changes
 
 
 @with_session
 @timeit
-async def save_attendance_records(attendance_df: pd.DataFrame, db_session: AsyncSession,start_date: Optional[datetime.date], end_date: Optional[datetime.date] ):
+async def save_attendance_records(attendance_df: pd.DataFrame, db_session: AsyncSession) -> SaveResult:
     """
     Saves attendance records from a Pandas DataFrame to the database.
+
+    New visits are inserted; visits whose status changed on the site are updated
+    in place and the change is appended to ``VisitingStatusChange``. The daily
+    attendance aggregate and the generation of every changed group are adjusted
+    in the same transaction.
+
+    Only the batch's pairs, links and visits are read, as plain columns. Pairs and
+    visits are inserted with ``ON CONFLICT DO NOTHING``, so a batch saved at the same
+    time by another sync does not fail; only the rows actually inserted are counted.
     """
+    result = SaveResult()
     if attendance_df.empty:
         logging.warning("No attendance records to save.")
-        return
-    pairs_query = select(Pair).options(joinedload(Pair.visits)).filter(Pair.date.between(start_date, end_date))
-    groups = {group.id: group for group in (await db_session.execute(select(Group))).scalars().unique()}
-    pairs = {pair.key_pair: pair for pair in (await db_session.execute(pairs_query)).scalars().unique()}
-
-
-    visiting_records = []
-    pair_groups_map = []
-    grouped_records = attendance_df.groupby(['key_pair','date', 'discipline', 'pair_number'])
-
-    for (key_pair,date,discipline,pair_number), group_df in grouped_records:
-        key_pair = int(key_pair)
-        new_records_df = group_df
-        if pair := pairs.get(key_pair):
-            if pair.visits:
-                existing_records = list(map(lambda visit: visit.student_id,pair.visits))
-        
-                new_records_df: pd.DataFrame = group_df[~group_df["student_id"].isin(existing_records)]
-        else:
-            pair = await get_or_create_pair(
-            db_session=db_session,
-            key_pair=key_pair,
-            date=date,
-            pair_number=pair_number,
-            discipline=discipline
-            )
-        if not pair:
-            logging.warning(f"Skipping pair: {date}, {discipline}, {pair_number}")
-            continue
-        group_ids = tuple(map(int, group_df['group_id'].unique()))
-        if pair.id not in pair_groups_map:
-            _groups = list(map(lambda _group: groups[_group],group_ids))
-            await associate_pair_with_groups(db_session, pair,_groups)
-            pair_groups_map.append(pair.id)
-        
-            
-
-        if not new_records_df.empty:
-                new_visiting_records = new_records_df.assign(
-                    pair_id=pair.id,
-                    status=new_records_df["status"].apply(status_enum),
-                ).rename(columns={
-                        "detail": "message"}).loc[
-                    :, ["student_id", "pair_id", "status", "message"]
-                ]
-                visiting_records.extend(new_visiting_records.to_dict(orient="records"))
-    if visiting_records:
-        start = time.perf_counter_ns()
-        await db_session.execute(insert(Visiting), visiting_records)
-        await db_session.commit()
-        end = time.perf_counter_ns()
-        logging.info(f"Saved {len(visiting_records)} new attendance records.")
+        return result
+    attendance_df = attendance_df.assign(key_pair=attendance_df["key_pair"].astype(int))
+    pair_rows = attendance_df.drop_duplicates("key_pair")
+    pairs = await get_or_create_pairs(db_session=db_session, pairs=[
+        {"key_pair": int(key_pair), "date": date, "pair_number": int(pair_number), "discipline": discipline}
+        for key_pair, date, pair_number, discipline in zip(
+            pair_rows["key_pair"], pair_rows["date"], pair_rows["pair_number"], pair_rows["discipline"])
+    ])
+    if skipped := set(pair_rows["key_pair"]).difference(pairs):
+        logging.warning(f"Skipping records of {len(skipped)} pairs that could not be saved: {sorted(skipped)}")
+    records_df = (
+        attendance_df.assign(pair_id=attendance_df["key_pair"].map({key: pair.id for key, pair in pairs.items()}))
+        .dropna(subset=["pair_id"])
+        .astype({"pair_id": int, "student_id": int, "group_id": int})
+    )
+    if records_df.empty:
+        return result
+    pair_dates = {pair.id: pair.date for pair in pairs.values()}
+    await link_pairs_to_groups(db_session=db_session, links=zip(records_df["group_id"], records_df["pair_id"]))
+    records_df = records_df.drop_duplicates(["student_id", "pair_id"], keep="last")
+
+    visits_query = select(Visiting.id, Visiting.student_id, Visiting.pair_id, Visiting.status).where(
+        Visiting.pair_id.in_(pair_dates))
+    existing_visits = {(visit.student_id, visit.pair_id): visit for visit in await db_session.execute(visits_query)}
+    is_known = pd.Series(
+        [key in existing_visits for key in zip(records_df["student_id"], records_df["pair_id"])],
+        index=records_df.index, dtype=bool,
+    )
+    daily_deltas: Dict[Tuple[int, datetime.date, AttendanceStatus], int] = defaultdict(int)
+    status_changes = _collect_status_changes(existing_visits, records_df[is_known], datetime.datetime.now(tz))
+    for change in status_changes:
+        daily_deltas[(change["student_id"], pair_dates[change["pair_id"]], change["old_status"])] -= 1
+        daily_deltas[(change["student_id"], pair_dates[change["pair_id"]], change["new_status"])] += 1
+
+    new_records_df = records_df[~is_known]
+    if not new_records_df.empty:
+        visiting_records = new_records_df.assign(status=new_records_df["status"].map(status_enum)).rename(
+            columns={"detail": "message"}).loc[:, ["student_id", "pair_id", "status", "message"]]
+        statement = dialect_insert(db_session, Visiting).on_conflict_do_nothing(
+            index_elements=[Visiting.student_id, Visiting.pair_id])
+        inserted = (await db_session.execute(
+            statement.returning(Visiting.student_id, Visiting.pair_id, Visiting.status),
+            visiting_records.to_dict(orient="records"),
+        )).all()
+        for student_id, pair_id, status in inserted:
+            daily_deltas[(student_id, pair_dates[pair_id], status)] += 1
+        result.inserted = len(inserted)
+        result.student_ids.update(student_id for student_id, _, _ in inserted)
+        logging.info(f"Saved {len(inserted)} new attendance records.")
     else:
         logging.info("No new attendance records to save.")
 
-
-async def associate_pair_with_groups(db_session: AsyncSession, pair: Pair, groups: List[Group]) -> None:
-    """Associate a pair with multiple groups."""
-    if values := [
-        {'group_id': group.id, 'pair_id': pair.id}
-        for group in groups
-        if pair not in group.pairs
-    ]:
-        await db_session.execute(insert(group_pair_association), values)
+    if status_changes:
+        await db_session.execute(update(Visiting), [
+            {"id": change["visiting_id"], "status": change["new_status"], "message": change["message"]}
+            for change in status_changes
+        ])
+        await db_session.execute(insert(VisitingStatusChange), [
+            {key: value for key, value in change.items() if key != "message"}
+            for change in status_changes
+        ])
+        result.updated = len(status_changes)
+        result.student_ids.update(change["student_id"] for change in status_changes)
+        logging.info(f"Updated {len(status_changes)} attendance records with changed status.")
+
+    await apply_daily_attendance_deltas(db_session=db_session, deltas=daily_deltas)
+    if result.student_ids:
+        changed_groups = attendance_df.loc[attendance_df["student_id"].isin(result.student_ids), "group_id"].unique()
+        await bump_group_generations(db_session=db_session, group_ids=map(int, changed_groups))
+    await db_session.commit()
+    return result
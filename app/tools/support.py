@@ -8,7 +8,12 @@ from functools import wraps
 from typing import Awaitable, Callable, Any
 import logging
 
-from app.core.settings import TEST_MODE,DIR_DATA
+from app.core.settings import TEST_MODE,DIR_DATA,tz
+
+
+def local_now() -> datetime:
+    """Current wall-clock time in `tz` without tzinfo, the form `last_parsed_at` is stored in."""
+    return datetime.now(tz).replace(tzinfo=None)
 
 
 def timeit(func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
@@ -1,9 +1,11 @@
 import asyncio
 import contextlib
+import datetime
 import logging
 import sys
 import functools
 import typer
+from typing import Optional
 
 cli = typer.Typer(no_args_is_help=True)
 
@@ -31,5 +33,76 @@ def run_bot(is_models:bool = True) -> None:
         asyncio.run(initialize_application(is_models))
 
 
+@cli.command(help="Run headless visiting sync workers")
+@handle_command_errors
+def run_workers(count: int = 2, is_models: bool = True) -> None:
+    """
+    Command to run sync workers that process jobs queued by the bot.
+    """
+    from app.app import run_sync_workers
+    run_sync_workers(count, is_models)
+
+
+@cli.command(help="Backfill attendance history in checkpointed windows")
+@handle_command_errors
+def backfill(
+    start: str = "2025-01-01",
+    end: Optional[str] = None,
+    window: str = "month",
+    teacher_telegram_id: Optional[int] = None,
+    is_models: bool = True,
+) -> None:
+    """
+    Command to backfill attendance history. Rerun it to resume after a crash or deploy.
+    """
+    from app.app import run_backfill
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run_backfill(
+            start_date=datetime.date.fromisoformat(start),
+            end_date=datetime.date.fromisoformat(end) if end else None,
+            window=window,
+            teacher_telegram_id=teacher_telegram_id,
+            is_models=is_models,
+        ))
+
+
+@cli.command(help="Rebuild the daily attendance aggregate from stored visits")
+@handle_command_errors
+def rebuild_daily_attendance(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    is_models: bool = True,
+) -> None:
+    """
+    Command to recompute the daily attendance counts, for all dates or a range only.
+    It is built automatically on start-up while empty; run it whenever visits were changed outside the sync.
+    """
+    from app.app import run_rebuild_daily_attendance
+    asyncio.run(run_rebuild_daily_attendance(
+        start_date=datetime.date.fromisoformat(start) if start else None,
+        end_date=datetime.date.fromisoformat(end) if end else None,
+        is_models=is_models,
+    ))
+
+
+@cli.command(help="Export attendance history to Parquet files partitioned by month")
+@handle_command_errors
+def export_attendance(
+    output: str = "data/export/attendance",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> None:
+    """
+    Command to export visits with their pair, student and group for offline analytics.
+    The range is widened to whole months; exported months are overwritten.
+    """
+    from app.app import run_export_attendance
+    asyncio.run(run_export_attendance(
+        output_dir=output,
+        start_date=datetime.date.fromisoformat(start) if start else None,
+        end_date=datetime.date.fromisoformat(end) if end else None,
+    ))
+
+
 if __name__ == '__main__':
     cli()